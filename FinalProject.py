@@ -1,28 +1,42 @@
+import argparse
+import math
 import os
+import random
 import glfw
 from OpenGL.GL import *
-from PIL import Image, ImageEnhance
 import sys
-import random
 import time
-import pygame
+from game_state import (GameState, TICK_RATE, WINDOW_WIDTH, WINDOW_HEIGHT, WALL_WIDTH, CHAR_WIDTH, CHAR_HEIGHT,
+                        EVENT_JUMP, EVENT_LAND, EVENT_WALL_BOUNCE, EVENT_GAME_OVER)
+from sprite_batch import SpriteBatch
+from assets import ASSETS_ENV, asset_root, load_atlas, load_atlas_async
+from loader import AssetLoader
+from audio import Audio, PRIORITY_NORMAL, decode_sound
+from texture_atlas import load_image, make_atlas
+from text_renderer import GlyphAtlas, TextLabel
+from replay import Replay, load_replay, fast_forward
+from profiler import FrameProfiler, ProfilerOverlay
+from frame_pacer import FramePacer
+from band_cache import BandCache
+from input_queue import InputQueue
+from render_scale import RenderScaler
+from particles import ParticleSystem, POINT_SIZE
 
 # ==================== Sound ====================
-pygame.mixer.init()
-jump_sound = pygame.mixer.Sound(
-    r"Sounds/Jump.wav"
-)
-jump_sound.set_volume(0.3)  
-
-game_play_sound = pygame.mixer.Sound(
-    r"Sounds/GamePlay.wav"
-)
-game_play_sound.set_volume(0.2)  
-
-game_over_sound = pygame.mixer.Sound(
-    r"Sounds/GameOver.wav"
-)
-game_over_sound.set_volume(0.5)
+# See audio.py. pygame is only imported, and the mixer only started, when
+# loading begins; effects are decoded on the asset loader, music streams.
+EFFECTS = [
+    # name, file in Sounds/, volume, priority, voices
+    ("jump", "Jump.wav", 0.3, PRIORITY_NORMAL, 2),
+]
+GAME_PLAY_MUSIC = ("GamePlay.wav", 0.2)
+GAME_OVER_MUSIC = ("GameOver.wav", 0.5)
+audio = Audio()
+sounds_dir = None
+
+def play_music(music, loops=-1):
+    filename, volume = music
+    audio.play_music(os.path.join(sounds_dir, filename), volume, loops)
 
 
 game_over_texture = None
@@ -30,47 +44,18 @@ game_over_w = 0
 game_over_h = 0
 
 
-# ==================== Window Settings ====================
-WINDOW_WIDTH = 600
-WINDOW_HEIGHT = 800
-
-# ==================== Character Variables ====================
-x_pos = 300
-y_pos = 0   # will initialize after game starts
-speed = 3
-flip = False
-
-is_jumping = False
-y_velocity = 0
-jump_speed = 15
-gravity = -0.6
-ground_y = 0
-char_width = 50
-char_height = 50
-
-current_texture = None
-
 # ==================== Game State ====================
-game_started = False
-fall_detected = False
-successful_jumps = 0
-camera_speed_base = 1.5
-camera_speed = camera_speed_base
-score = 0  # new: player's score
-
-# ==================== Bounce Effect Variables ====================
-bounce_effect = False
-bounce_timer = 0
-bounce_direction = 0  # 1 for right, -1 for left
-bounce_speed = 8
-
-# ==================== Platform Variables ====================
-platforms = []
+# All simulation state lives in a GameState (see game_state.py)
+state = None
+current_texture = None
 
-# ==================== Camera ====================
-camera_y = 0.0  # how much world is shifted up (player moves up, camera follows)
+# ==================== Record / Replay ====================
+recording = None  # Replay being recorded, if --record was given
+playback = None   # Replay whose inputs drive the game, if --replay was given
 
 # ==================== Texture Variables ====================
+# Atlas regions (see texture_atlas.py), None when the image failed to load
+atlas = None
 background_texture = None
 wall_texture = None
 bar_left_texture = None
@@ -85,528 +70,587 @@ idle_texture = None
 walk_texture = None
 jump_texture = None
 
-# ==================== Safe texture loader ====================
-def load_texture(path, brightness=1.0):
-    try:
-        img = Image.open(path)
-    except Exception as e:
-        print(f"Failed to open texture: {path}\n   {e}")
-        return 0, 0, 0
-
-    img = img.transpose(Image.FLIP_TOP_BOTTOM)
-    if brightness != 1.0:
-        img = ImageEnhance.Brightness(img).enhance(brightness)
-
-    img_data = img.convert("RGBA").tobytes()
-    tex_id = glGenTextures(1)
-    glBindTexture(GL_TEXTURE_2D, tex_id)
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-    glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, img.width, img.height, 0,
-                 GL_RGBA, GL_UNSIGNED_BYTE, img_data)
-    glBindTexture(GL_TEXTURE_2D, 0)
-    return tex_id, img.width, img.height
+# ==================== Renderer ====================
+batch = None  # SpriteBatch, created once the GL context exists
+band_cache = None  # BandCache of the tower behind the character, see draw_tower_band()
+band_world = None  # the GameState whose tower band_cache holds
 
 # ==================== Draw Character Sprite ====================
-def draw_sprite(x, y, texture_id, scale=50, flip_x=False):
-    if texture_id == 0:
-        glColor3f(1.0, 0.0, 1.0)
-        w = scale; h = scale
-        glBegin(GL_QUADS)
-        glVertex2f(x - w/2, y - h/2)
-        glVertex2f(x + w/2, y - h/2)
-        glVertex2f(x + w/2, y + h/2)
-        glVertex2f(x - w/2, y + h/2)
-        glEnd()
-        return
-
-    glEnable(GL_TEXTURE_2D)
-    glBindTexture(GL_TEXTURE_2D, texture_id)
+def draw_sprite(x, y, texture, scale=50, flip_x=False):
     w = scale
     h = scale
-    glColor3f(1,1,1)
-    glBegin(GL_QUADS)
-    if flip_x:
-        glTexCoord2f(1, 0); glVertex2f(x - w/2, y - h/2)
-        glTexCoord2f(0, 0); glVertex2f(x + w/2, y - h/2)
-        glTexCoord2f(0, 1); glVertex2f(x + w/2, y + h/2)
-        glTexCoord2f(1, 1); glVertex2f(x - w/2, y + h/2)
-    else:
-        glTexCoord2f(0, 0); glVertex2f(x - w/2, y - h/2)
-        glTexCoord2f(1, 0); glVertex2f(x + w/2, y - h/2)
-        glTexCoord2f(1, 1); glVertex2f(x + w/2, y + h/2)
-        glTexCoord2f(0, 1); glVertex2f(x - w/2, y + h/2)
-    glEnd()
-    glBindTexture(GL_TEXTURE_2D, 0)
-    glDisable(GL_TEXTURE_2D)
-
-# ==================== Platform Class ====================
-class Platform:
-    def __init__(self, x, y, width, height, is_ground=False):
-        self.x = x
-        self.y = y
-        self.width = width
-        self.height = height
-        self.is_ground = is_ground
-
-    def draw(self):
-        tex_l = bar_left_texture
-        tex_m = bar_middle_texture
-        tex_r = bar_right_texture
-        w_l = bar_left_w
-        w_m = bar_middle_w
-        w_r = bar_right_w
-
-        if self.is_ground:
-            tex_l = tex_m = tex_r = ground_texture
-            w_l = w_m = w_r = self.width
-
-        self.draw_part(self.x, self.y, tex_l, w_l, self.height)
-        if not self.is_ground:
-            middle_total_width = max(0, self.width - (bar_left_w + bar_right_w))
-            full_segments = middle_total_width // bar_middle_w if bar_middle_w>0 else 0
-            remainder = middle_total_width % bar_middle_w if bar_middle_w>0 else 0
-            for i in range(full_segments):
-                x_pos = self.x + bar_left_w + i * bar_middle_w
-                self.draw_part(x_pos, self.y, bar_middle_texture, bar_middle_w, self.height)
-            if remainder>0:
-                x_pos = self.x + bar_left_w + full_segments*bar_middle_w
-                self.draw_part(x_pos, self.y, bar_middle_texture, remainder, self.height, stretch=True)
-            right_x = self.x + self.width - bar_right_w
-            self.draw_part(right_x, self.y, bar_right_texture, bar_right_w, self.height)
-
-    def draw_part(self, x, y, texture, tex_w, height, stretch=False):
-        if texture==0 or tex_w==0:
-            glColor3f(0.5,0.5,0.5)
-            glBegin(GL_QUADS)
-            glVertex2f(x, y)
-            glVertex2f(x + tex_w, y)
-            glVertex2f(x + tex_w, y + height)
-            glVertex2f(x, y + height)
-            glEnd()
-            return
-        glEnable(GL_TEXTURE_2D)
-        glBindTexture(GL_TEXTURE_2D, texture)
-        glColor3f(1,1,1)
-        glBegin(GL_QUADS)
-        if stretch:
-            glTexCoord2f(0,0); glVertex2f(x,y)
-            glTexCoord2f(1,0); glVertex2f(x+tex_w,y)
-            glTexCoord2f(1,1); glVertex2f(x+tex_w,y+height)
-            glTexCoord2f(0,1); glVertex2f(x,y+height)
-        else:
-            glTexCoord2f(0,0); glVertex2f(x,y)
-            glTexCoord2f(1,0); glVertex2f(x+tex_w,y)
-            glTexCoord2f(1,1); glVertex2f(x+tex_w,y+height)
-            glTexCoord2f(0,1); glVertex2f(x,y+height)
-        glEnd()
-        glDisable(GL_TEXTURE_2D)
-
-# ==================== Platform Generation ====================
-def generate_platforms(min_y, max_y):
-    global platforms
-    wall_width = 75
-    y = max([p.y for p in platforms])+random.randint(100,150) if platforms else ground_y + 50
-    while y < max_y:
-        platform_width = random.randint(100,150)
-        x = random.randint(wall_width, WINDOW_WIDTH - wall_width - platform_width)
-        platform_height = 40
-        platforms.append(Platform(x, y, platform_width, platform_height))
-        y += random.randint(80,150)
-
-# ==================== Physics Helpers ====================
-def is_character_on_solid_ground():
-    global y_pos
-    if y_pos <= ground_y + char_height/2:
-        y_pos = ground_y + char_height/2
-        return True
-    player_bottom = y_pos - char_height/2
-    for platform in platforms:
-        platform_top = platform.y + platform.height
-        if (x_pos-25 < platform.x + platform.width and x_pos+25 > platform.x and
-            player_bottom >= platform_top - 10 and player_bottom <= platform_top + 10):
-            y_pos = platform_top + char_height/2
-            return True
-    return False
-
-def check_platform_collision():
-    global y_pos, y_velocity, is_jumping, successful_jumps, camera_speed, score
-    if y_velocity < 0:
-        player_bottom = y_pos - char_height/2
-        for platform in platforms:
-            platform_top = platform.y + platform.height
-            if (x_pos - char_width/2 < platform.x + platform.width and
-                x_pos + char_width/2 > platform.x and
-                player_bottom >= platform_top - 10 and player_bottom <= platform_top + 20):
-                
-                # Land on the platform
-                y_pos = platform_top + char_height/2
-                y_velocity = 0
-                
-                if is_jumping:
-                    successful_jumps += 1
-                    score += 1  # increment score when landing on a platform
-                    # Increase camera speed every 10 jumps
-                    if successful_jumps % 10 == 0:
-                        camera_speed += 0.5
-                        
-                is_jumping = False
-                return True
-    return False
-
-pygame.font.init()
-font = pygame.font.SysFont("Arial", 36)
+    if texture is None:
+        batch.draw_quad(0, x - w/2, y - h/2, x + w/2, y + h/2, color=(1.0, 0.0, 1.0, 1.0))
+        return
+    batch.draw_region(texture, x - w/2, y - h/2, x + w/2, y + h/2, flip_x=flip_x)
+
+# ==================== Draw Platforms ====================
+def draw_platform(platform):
+    tex_l = bar_left_texture
+    w_l = bar_left_w
+
+    if platform.is_ground:
+        tex_l = ground_texture
+        w_l = platform.width
+
+    draw_platform_part(platform.x, platform.y, tex_l, w_l, platform.height)
+    if not platform.is_ground:
+        middle_total_width = max(0, platform.width - (bar_left_w + bar_right_w))
+        full_segments = middle_total_width // bar_middle_w if bar_middle_w>0 else 0
+        remainder = middle_total_width % bar_middle_w if bar_middle_w>0 else 0
+        for i in range(full_segments):
+            x = platform.x + bar_left_w + i * bar_middle_w
+            draw_platform_part(x, platform.y, bar_middle_texture, bar_middle_w, platform.height)
+        if remainder>0:
+            x = platform.x + bar_left_w + full_segments*bar_middle_w
+            draw_platform_part(x, platform.y, bar_middle_texture, remainder, platform.height)
+        right_x = platform.x + platform.width - bar_right_w
+        draw_platform_part(right_x, platform.y, bar_right_texture, bar_right_w, platform.height)
+
+def draw_platform_part(x, y, texture, tex_w, height):
+    if texture is None or tex_w==0:
+        batch.draw_quad(0, x, y, x + tex_w, y + height, color=(0.5, 0.5, 0.5, 1.0))
+        return
+    batch.draw_region(texture, x, y, x + tex_w, y + height)
+
+# ==================== Fonts ====================
+# pygame's font module and the system font scan only run on first use
+fonts = {}
+
+def get_font(size):
+    font = fonts.get(size)
+    if font is None:
+        import pygame
+        pygame.font.init()
+        font = fonts[size] = pygame.font.SysFont("Arial", size)
+    return font
+
+glyph_atlas = None   # GlyphAtlas for the score font, created once the GL context exists
+score_label = None
 
 def draw_score():
-    global score
-    text = f"Score: {score}"
-    # Render text to surface
-    surface = font.render(text, True, (255, 255, 255))
-    data = pygame.image.tostring(surface, "RGBA", True)
-    
-    # Generate OpenGL texture
-    tex_id = glGenTextures(1)
-    glBindTexture(GL_TEXTURE_2D, tex_id)
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-    glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, surface.get_width(), surface.get_height(),
-                 0, GL_RGBA, GL_UNSIGNED_BYTE, data)
-    
-    # Draw texture in screen space
+    score_label.set_text(f"Score: {state.score}")  # only re-laid out when the score changes
+
+    # Draw in screen space
     glMatrixMode(GL_MODELVIEW)
     glPushMatrix()
     glLoadIdentity()  # draw in screen coordinates
-    glEnable(GL_TEXTURE_2D)
-    glBindTexture(GL_TEXTURE_2D, tex_id)
-    x, y = 10, WINDOW_HEIGHT - 50
-    w, h = surface.get_width(), surface.get_height()
-    glColor3f(1, 1, 1)
-    glBegin(GL_QUADS)
-    glTexCoord2f(0,0); glVertex2f(x, y)
-    glTexCoord2f(1,0); glVertex2f(x + w, y)
-    glTexCoord2f(1,1); glVertex2f(x + w, y + h)
-    glTexCoord2f(0,1); glVertex2f(x, y + h)
-    glEnd()
-    glBindTexture(GL_TEXTURE_2D, 0)
-    glDisable(GL_TEXTURE_2D)
+    score_label.draw(batch)
+    batch.flush()
     glPopMatrix()
-    
-    glDeleteTextures([tex_id])  # free texture memory
-
-# ==================== Bounce Update ====================
-def update_bounce_effect():
-    global x_pos, bounce_effect, bounce_timer, bounce_direction
-    if bounce_effect and bounce_timer>0:
-        x_pos += bounce_direction*bounce_speed*(bounce_timer/10)
-        bounce_timer -=1
-        if bounce_timer<=0:
-            bounce_effect = False
-            bounce_timer=0
-
-# ==================== Movement ====================
-def update_movement(window):
-    global x_pos, flip, bounce_effect, bounce_timer, bounce_direction
-    moving = False
-    if fall_detected:
-        return False
-    update_bounce_effect()
-    if bounce_effect:
-        return True
-    wall_width = 75
-    char_half = 25
-    if glfw.get_key(window, glfw.KEY_RIGHT) == glfw.PRESS:
-        x_pos += speed
-        flip = False
-        moving = True
-        if x_pos > WINDOW_WIDTH - wall_width - char_half:
-            x_pos = WINDOW_WIDTH - wall_width - char_half
-            bounce_effect = True
-            bounce_timer = 10
-            bounce_direction = -1
-    if glfw.get_key(window, glfw.KEY_LEFT) == glfw.PRESS:
-        x_pos -= speed
-        flip = True
-        moving = True
-        if x_pos < wall_width + char_half:
-            x_pos = wall_width + char_half
-            bounce_effect = True
-            bounce_timer = 10
-            bounce_direction = 1
-    return moving
 
 # ==================== Draw Infinite Background ====================
-def draw_background():
-    if background_texture == 0:
-        glColor3f(0.6, 0.8, 1.0)
-        glBegin(GL_QUADS)
-        glVertex2f(0, 0)
-        glVertex2f(WINDOW_WIDTH, 0)
-        glVertex2f(WINDOW_WIDTH, WINDOW_HEIGHT)
-        glVertex2f(0, WINDOW_HEIGHT)
-        glEnd()
+def draw_background_tile(y):
+    if background_texture is None:
+        batch.draw_quad(0, 0, y, WINDOW_WIDTH, y + WINDOW_HEIGHT, color=(0.6, 0.8, 1.0, 1.0))
         return
-
-    glEnable(GL_TEXTURE_2D)
-    glBindTexture(GL_TEXTURE_2D, background_texture)
-    glColor3f(1, 1, 1)
-
-    start_y = int(camera_y // WINDOW_HEIGHT) * WINDOW_HEIGHT
-    end_y = int((camera_y + WINDOW_HEIGHT*2) // WINDOW_HEIGHT) * WINDOW_HEIGHT
-
-    y = start_y
-    while y <= end_y:
-        glBegin(GL_QUADS)
-        glTexCoord2f(0, 0); glVertex2f(0, y)
-        glTexCoord2f(1, 0); glVertex2f(WINDOW_WIDTH, y)
-        glTexCoord2f(1, 1); glVertex2f(WINDOW_WIDTH, y + WINDOW_HEIGHT)
-        glTexCoord2f(0, 1); glVertex2f(0, y + WINDOW_HEIGHT)
-        glEnd()
-        y += WINDOW_HEIGHT
-
-    glDisable(GL_TEXTURE_2D)
+    batch.draw_region(background_texture, 0, y, WINDOW_WIDTH, y + WINDOW_HEIGHT)
 
 # ==================== Draw Infinite Walls ====================
-def draw_walls():
-    wall_w = 75
-    start_y = int(camera_y // WINDOW_HEIGHT) * WINDOW_HEIGHT
-    end_y = int((camera_y + WINDOW_HEIGHT*2) // WINDOW_HEIGHT) * WINDOW_HEIGHT
-    y = start_y
-
-    while y <= end_y:
-        if wall_texture == 0:
-            glColor3f(0.3, 0.3, 0.3)
-            # Left wall
-            glBegin(GL_QUADS)
-            glVertex2f(0, y)
-            glVertex2f(wall_w, y)
-            glVertex2f(wall_w, y + WINDOW_HEIGHT)
-            glVertex2f(0, y + WINDOW_HEIGHT)
-            glEnd()
-            # Right wall
-            glBegin(GL_QUADS)
-            glVertex2f(WINDOW_WIDTH - wall_w, y)
-            glVertex2f(WINDOW_WIDTH, y)
-            glVertex2f(WINDOW_WIDTH, y + WINDOW_HEIGHT)
-            glVertex2f(WINDOW_WIDTH - wall_w, y + WINDOW_HEIGHT)
-            glEnd()
-        else:
-            glEnable(GL_TEXTURE_2D)
-            glBindTexture(GL_TEXTURE_2D, wall_texture)
-            glColor3f(1, 1, 1)
-            # Left
-            glBegin(GL_QUADS)
-            glTexCoord2f(0,0); glVertex2f(0, y)
-            glTexCoord2f(1,0); glVertex2f(wall_w, y)
-            glTexCoord2f(1,1); glVertex2f(wall_w, y + WINDOW_HEIGHT)
-            glTexCoord2f(0,1); glVertex2f(0, y + WINDOW_HEIGHT)
-            glEnd()
-            # Right
-            glBegin(GL_QUADS)
-            glTexCoord2f(0,0); glVertex2f(WINDOW_WIDTH - wall_w, y)
-            glTexCoord2f(1,0); glVertex2f(WINDOW_WIDTH, y)
-            glTexCoord2f(1,1); glVertex2f(WINDOW_WIDTH, y + WINDOW_HEIGHT)
-            glTexCoord2f(0,1); glVertex2f(WINDOW_WIDTH - wall_w, y + WINDOW_HEIGHT)
-            glEnd()
-            glDisable(GL_TEXTURE_2D)
-        y += WINDOW_HEIGHT
+def draw_wall_tile(y):
+    wall_w = WALL_WIDTH
+    if wall_texture is None:
+        color = (0.3, 0.3, 0.3, 1.0)
+        batch.draw_quad(0, 0, y, wall_w, y + WINDOW_HEIGHT, color=color)
+        batch.draw_quad(0, WINDOW_WIDTH - wall_w, y, WINDOW_WIDTH, y + WINDOW_HEIGHT, color=color)
+    else:
+        batch.draw_region(wall_texture, 0, y, wall_w, y + WINDOW_HEIGHT)
+        batch.draw_region(wall_texture, WINDOW_WIDTH - wall_w, y, WINDOW_WIDTH, y + WINDOW_HEIGHT)
+
+# ==================== Draw Tower Bands ====================
+# See band_cache.py. A band is one background and wall tile high, so band k
+# is exactly tile k plus the platforms crossing it.
+def draw_tower_band(k):
+    y = k*WINDOW_HEIGHT
+    draw_background_tile(y)
+    draw_wall_tile(y)
+    for p in state.platforms.query(y, y + WINDOW_HEIGHT):
+        draw_platform(p)
+
+def draw_tower(view_y):
+    global band_world
+    if band_world is not state:
+        band_cache.invalidate()
+        band_world = state
+    band_cache.draw(batch, view_y, WINDOW_HEIGHT, state.platforms.top_y())
 
 def draw_game_over():
-    if game_over_texture == 0:
+    if game_over_texture is None:
         return
 
-    glEnable(GL_TEXTURE_2D)
-    glBindTexture(GL_TEXTURE_2D, game_over_texture)
-    glColor3f(1, 1, 1)
-
     w = 400
     h = 200
     x = WINDOW_WIDTH // 2
     y = WINDOW_HEIGHT // 2
+    batch.draw_region(game_over_texture, x - w/2, y - h/2, x + w/2, y + h/2)
+
+
+# ==================== Effects ====================
+# See particles.py. A landing kicks up dust; a wall bounce throws sparks off
+# the wall and leaves a trail while the character is pushed back; landing
+# after a bounce (a combo) adds a burst of sparkles.
+particles = None  # ParticleSystem, created once the GL context exists
+combo = False     # bounced off a wall since the last landing
+
+DUST_COLOR = (0.85, 0.9, 1.0, 0.8)
+SPARK_COLOR = (1.0, 0.85, 0.3, 1.0)
+TRAIL_COLOR = (0.6, 0.85, 1.0, 0.5)
+SPARKLE_COLORS = [(1.0, 1.0, 0.5, 1.0), (0.5, 1.0, 1.0, 1.0), (1.0, 0.5, 1.0, 1.0)]
+
+def update_particles(events):
+    global combo
+    for event in events:
+        if event == EVENT_LAND:
+            feet = state.y - CHAR_HEIGHT/2
+            particles.emit(state.x, feet, 24, 2.5, angle=math.pi/2, spread=math.pi*0.9, life=25,
+                           color=DUST_COLOR, gravity=0.5, jitter=CHAR_WIDTH/4)
+            if combo:
+                for color in SPARKLE_COLORS:
+                    particles.emit(state.x, state.y, 40, 5, life=45, color=color, gravity=0.3)
+            combo = False
+        elif event == EVENT_WALL_BOUNCE:
+            wall_x = state.x - state.bounce_direction*CHAR_WIDTH/2
+            particles.emit(wall_x, state.y, 30, 4, angle=0 if state.bounce_direction > 0 else math.pi,
+                           spread=math.pi*0.8, life=30, color=SPARK_COLOR)
+            combo = True
+    if state.bounce_effect:
+        particles.emit(state.x, state.y, 3, 0.5, life=20, color=TRAIL_COLOR, gravity=0, jitter=CHAR_WIDTH/3)
+    particles.update()
+
+# ==================== Simulation Tick ====================
+# The simulation advances in fixed ticks; every speed in game_state.py is per
+# tick. The main loop runs as many ticks as real time requires and draws
+# positions interpolated between the last two.
+SIM_DT = 1.0 / TICK_RATE
+MAX_FRAME_TIME = 0.25  # longest hitch the simulation catches up on
+
+# ==================== Frame Pacing ====================
+# See frame_pacer.py. Frames are capped at --fps (60 by default, 0 for no cap)
+# and --vsync syncs buffer swaps to the display.
+DEFAULT_FPS = 60
+pacer = None
+
+def refresh_rate():
+    # The primary monitor's refresh rate, or None without one
+    monitor = glfw.get_primary_monitor()
+    mode = glfw.get_video_mode(monitor) if monitor else None
+    return mode.refresh_rate if mode else None
+
+# ==================== Input ====================
+# See input_queue.py: arrow keys and space come from GLFW's key callback and
+# are applied on the tick they happened in.
+input_queue = InputQueue()
+
+def next_inputs(tick_time):
+    # Recorded inputs while a replay lasts, the keyboard afterwards
+    inputs = input_queue.inputs_until(tick_time)
+    if playback is not None and state.tick < len(playback.inputs):
+        return playback.inputs[state.tick]
+    return inputs
+
+def update_game(tick_time):
+    inputs = next_inputs(tick_time)
+    if recording is not None:
+        recording.record(inputs)
+    events = state.step(inputs)
+    input_queue.stepped(events)
+    for event in events:
+        if event == EVENT_JUMP:
+            audio.play("jump")
+        elif event == EVENT_GAME_OVER:
+            play_music(GAME_OVER_MUSIC, loops=0)
+
+    update_particles(events)
+    update_game_textures()
+
+def update_game_textures():
+    global current_texture
+    if state.is_jumping:
+        current_texture = jump_texture
+    elif state.moving or state.bounce_effect:
+        current_texture = walk_texture
+    else:
+        current_texture = idle_texture
+
+# ==================== Profiler ====================
+# Every frame is split into phases (see profiler.py). F3 shows the overlay,
+# --trace writes a Chrome trace.
+profiler = FrameProfiler()
+profiler_overlay = None  # ProfilerOverlay, created the first time it is shown
+
+def toggle_profiler_overlay():
+    global profiler_overlay
+    if profiler_overlay is None:
+        profiler_overlay = ProfilerOverlay(profiler, GlyphAtlas(get_font(14)), 10, 10, WINDOW_WIDTH - 20)
+    profiler_overlay.toggle()
+
+def count_frame_stats():
+    profiler.count("draw_calls", batch.draw_calls)
+    profiler.count("texture_binds", batch.texture_binds)
+    profiler.count("quads", batch.quads)
+    profiler.count("platforms", len(state.platforms))
+    profiler.count("band_renders", band_cache.renders)
+    profiler.count("particles", particles.count)
+    profiler.count("missed_frames", pacer.missed)
+    profiler.count("input_ms", round(input_queue.latency()[0], 1))
+    if pacer.frames % 30 == 0:
+        profiler.count("jitter_ms", round(pacer.stats()["jitter_ms"], 2))
+    if render_scaler is not None:
+        profiler.count("render_scale", render_scaler.scale if render_scaler.active else 1.0)
+
+def draw_profiler_overlay():
+    if profiler_overlay is None or not profiler_overlay.visible:
+        return
+    glMatrixMode(GL_MODELVIEW)
+    glPushMatrix()
+    glLoadIdentity()
+    profiler_overlay.draw(batch)
+    batch.flush()
+    glPopMatrix()
 
-    glBegin(GL_QUADS)
-    # NOTE: flipped V coordinates
-    glTexCoord2f(0, 1); glVertex2f(x - w/2, y - h/2)
-    glTexCoord2f(1, 1); glVertex2f(x + w/2, y - h/2)
-    glTexCoord2f(1, 0); glVertex2f(x + w/2, y + h/2)
-    glTexCoord2f(0, 0); glVertex2f(x - w/2, y + h/2)
-    glEnd()
+# ==================== Window Size ====================
+# The game keeps its WINDOW_WIDTH x WINDOW_HEIGHT coordinates at any window or
+# framebuffer size (high-DPI panels have more pixels than the window has
+# points): the view is scaled to fit and centred, with black bars on the
+# sides that are too long. See render_scale.py for --render-scale and
+# --target-ms, which draw the world at fewer pixels than the screen has.
+viewport = (0, 0, WINDOW_WIDTH, WINDOW_HEIGHT)  # x, y, width, height in framebuffer pixels
+render_scaler = None  # RenderScaler, if --render-scale or --target-ms was given
+
+def fit_viewport(fb_width, fb_height):
+    global viewport
+    if fb_width <= 0 or fb_height <= 0:  # minimised
+        return
+    zoom = min(fb_width / WINDOW_WIDTH, fb_height / WINDOW_HEIGHT)
+    width, height = round(WINDOW_WIDTH*zoom), round(WINDOW_HEIGHT*zoom)
+    viewport = ((fb_width - width) // 2, (fb_height - height) // 2, width, height)
+    glViewport(*viewport)
+    if render_scaler is not None:
+        render_scaler.resize(width, height)
+    update_band_scale()
+
+def update_band_scale():
+    # Band textures get as many texels per game pixel as the world is drawn at
+    scale = viewport[2] / WINDOW_WIDTH
+    if render_scaler is not None and render_scaler.active:
+        scale *= render_scaler.scale
+    band_cache.set_scale(scale)
+
+def framebuffer_resized(window, width, height):
+    fit_viewport(width, height)
+
+# ==================== Draw Frame ====================
+def draw_frame(draw_x, draw_y, view_y):
+    glClear(GL_COLOR_BUFFER_BIT)
+    batch.reset_stats()
+    band_cache.reset_stats()
+
+    # Draw world, into the scaled render target if there is one
+    scaled = render_scaler is not None and render_scaler.begin_world(WINDOW_WIDTH, WINDOW_HEIGHT)
+    if scaled:
+        glClear(GL_COLOR_BUFFER_BIT)
+    glPushMatrix()
+    glTranslatef(0, -view_y, 0)
+    profiler.begin("tower")
+    draw_tower(view_y)
+    profiler.end()
+    draw_sprite(draw_x, draw_y, current_texture, scale=CHAR_WIDTH, flip_x=state.flip)
+    batch.flush()
+    profiler.begin("particles")
+    particles.draw(POINT_SIZE*band_cache.scale)  # the world's pixels per game pixel
+    profiler.end()
+    glPopMatrix()
+    if scaled:
+        render_scaler.end_world(batch, WINDOW_WIDTH, WINDOW_HEIGHT)
 
-    glBindTexture(GL_TEXTURE_2D, 0)
-    glDisable(GL_TEXTURE_2D)
+    # Game over screen
+    if state.fall_detected:
+        glMatrixMode(GL_MODELVIEW)
+        glPushMatrix()
+        glLoadIdentity()
+        draw_game_over()
+        batch.flush()
+        glPopMatrix()
 
+    profiler.begin("score")
+    draw_score()
+    profiler.end()
 
-# ==================== Main Game Loop ====================
-def main():
+# ==================== Texture Lookup ====================
+def load_atlas_regions():
     global background_texture, wall_texture
     global bar_left_texture, bar_middle_texture, bar_right_texture, ground_texture
     global bar_left_w, bar_middle_w, bar_right_w
     global idle_texture, walk_texture, jump_texture, current_texture
-    global camera_y, platforms
-    global x_pos, y_pos, y_velocity, is_jumping, flip
-    global game_started, fall_detected, camera_speed
-
-    if not glfw.init():
-        sys.exit()
-    window = glfw.create_window(WINDOW_WIDTH, WINDOW_HEIGHT, "Icy Tower", None, None)
-    if not window:
-        glfw.terminate()
-        sys.exit()
-    glfw.make_context_current(window)
+    global game_over_texture, game_over_w, game_over_h
+
+    background_texture = atlas.get("background")
+    wall_texture = atlas.get("wall")
+    bar_left_texture = atlas.get("bar_left")
+    bar_middle_texture = atlas.get("bar_middle")
+    bar_right_texture = atlas.get("bar_right")
+    ground_texture = atlas.get("ground")
+    bar_left_w = bar_left_texture.width if bar_left_texture else 0
+    bar_middle_w = bar_middle_texture.width if bar_middle_texture else 0
+    bar_right_w = bar_right_texture.width if bar_right_texture else 0
+    idle_texture = atlas.get("idle")
+    walk_texture = atlas.get("walk")
+    jump_texture = atlas.get("jump")
+    current_texture = idle_texture
+    game_over_texture = atlas.get("game_over")
+    if game_over_texture:
+        game_over_w, game_over_h = game_over_texture.width, game_over_texture.height
+
+# ==================== Setup ====================
+# Everything that needs a current GL context; the benchmark calls these on an
+# offscreen context instead of a window
+def init_gl():
+    global batch, band_cache, particles
     glMatrixMode(GL_PROJECTION)
     glLoadIdentity()
     glOrtho(0, WINDOW_WIDTH, 0, WINDOW_HEIGHT, -1,1)
     glMatrixMode(GL_MODELVIEW)
     glEnable(GL_BLEND)
     glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+    batch = SpriteBatch()
+    band_cache = BandCache(draw_tower_band, WINDOW_WIDTH, WINDOW_HEIGHT)
+    particles = ParticleSystem()
+
+def load_textures(base_path):
+    global atlas
+    atlas = load_atlas(base_path)  # from Images/atlas.cache when it is up to date
+    atlas.upload()
+    load_atlas_regions()
+    band_cache.invalidate()
+
+def atlas_loaded(loaded):
+    global atlas
+    atlas = loaded
+    atlas.upload()
+    load_atlas_regions()
+    band_cache.invalidate()
+
+def init_text():
+    global glyph_atlas, score_label
+    glyph_atlas = GlyphAtlas(get_font(36))
+    score_label = TextLabel(glyph_atlas, 10, WINDOW_HEIGHT - 50)
+
+# ==================== Loading Screen ====================
+# Images, sounds and the atlas cache are read on worker threads; the main
+# thread uploads each finished piece and draws startBackground.png with a
+# progress bar in the meantime, so the window shows up right away.
+start_atlas = None
+start_background = None
+START_PANEL_CENTRE = 411 / 782  # the panel in startBackground.png is off-centre
+
+def start_background_loaded(img):
+    global start_atlas, start_background
+    if img is None:
+        return
+    start_atlas = make_atlas([(img.width, img.height, img.tobytes())],
+                             {"start": (0, 0, 0, img.width, img.height)}, {"start": "start"})
+    start_atlas.upload()
+    start_background = start_atlas.get("start")
+
+def start_loading(loader, root):
+    # root is the asset directory holding Images/ and Sounds/
+    images = os.path.join(root, "Images")
+    loader.submit(load_image, os.path.join(images, "startBackground.png"), on_done=start_background_loaded)
+    load_atlas_async(loader, images, atlas_loaded)
+    loader.submit(get_font, 36)
+    global sounds_dir
+    sounds_dir = os.path.join(root, "Sounds")
+    if audio.init():
+        for name, filename, *settings in EFFECTS:
+            loader.submit(decode_sound, os.path.join(sounds_dir, filename),
+                          on_done=lambda sound, name=name, settings=settings: audio.add_effect(name, sound, *settings))
+
+def draw_loading_screen(progress):
+    glClear(GL_COLOR_BUFFER_BIT)
+    glLoadIdentity()
+    if start_background is None:
+        batch.draw_quad(0, 0, 0, WINDOW_WIDTH, WINDOW_HEIGHT, color=(0.1, 0.1, 0.2, 1.0))
+    else:
+        # Scale to the window height with the paper panel in the middle
+        w = start_background.width * WINDOW_HEIGHT / start_background.height
+        x = WINDOW_WIDTH/2 - w*START_PANEL_CENTRE
+        batch.draw_region(start_background, x, 0, x + w, WINDOW_HEIGHT)
+
+    bar_x, bar_y, bar_w, bar_h = 150, 130, WINDOW_WIDTH - 300, 16
+    batch.draw_quad(0, bar_x - 2, bar_y - 2, bar_x + bar_w + 2, bar_y + bar_h + 2, color=(0.2, 0.1, 0.05, 1.0))
+    batch.draw_quad(0, bar_x, bar_y, bar_x + bar_w, bar_y + bar_h, color=(0.95, 0.92, 0.82, 1.0))
+    batch.draw_quad(0, bar_x, bar_y, bar_x + bar_w*progress, bar_y + bar_h, color=(0.6, 0.2, 0.1, 1.0))
+    batch.flush()
+
+def run_loading_screen(window, loader):
+    # Returns False if the window was closed before loading finished
+    shown = 0.0
+    while not loader.done:
+        if glfw.window_should_close(window):
+            loader.shutdown()
+            return False
+        glfw.poll_events()
+        loader.poll(timeout=SIM_DT)
+        shown = max(shown, loader.progress)  # follow-up jobs grow the total
+        draw_loading_screen(shown)
+        glfw.swap_buffers(window)
 
-    # Load textures
-    base_path = r"C:\Users\El-Wattaneya\3 Year CS\First Semester\Computer Graphics\Project\Icy_Tower_Project\Images"
-    background_texture,_,_ = load_texture(os.path.join(base_path,"gameBack.png"), 1.5)
-    wall_texture,_,_ = load_texture(os.path.join(base_path,"wall.png"))
-    bar_left_texture,bar_left_w,_ = load_texture(os.path.join(base_path,"bar_l1.png"))
-    bar_middle_texture,bar_middle_w,_ = load_texture(os.path.join(base_path,"bar_m1.png"))
-    bar_right_texture,bar_right_w,_ = load_texture(os.path.join(base_path,"bar_r1.png"))
-    ground_texture,_,_ = load_texture(os.path.join(base_path,"bar_m1.png"))
-    idle_texture,_,_ = load_texture(os.path.join(base_path,"character1_0.gif"))
-    walk_texture,_,_ = load_texture(os.path.join(base_path,"character1_1.gif"))
-    jump_texture,_,_ = load_texture(os.path.join(base_path,"character1_3.png"))
-    current_texture = idle_texture
-
-    game_over_texture, game_over_w, game_over_h = load_texture(
-    os.path.join(base_path, "GameOver.png")
-)
-    print("Game Over Texture ID:", game_over_texture)
-
-
-    # Platforms
-    platforms=[]
-    ground_platform = Platform(0, ground_y, WINDOW_WIDTH, 50, is_ground=True)
-    platforms.append(ground_platform)
-    generate_platforms(ground_y+50, WINDOW_HEIGHT*3)
+    if start_atlas is not None:
+        start_atlas.delete()
+    return True
 
-    x_pos = WINDOW_WIDTH//2
-    y_pos = ground_platform.y + ground_platform.height + char_height/2
-    camera_y = 0
+# ==================== Main Game Loop ====================
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Icy Tower")
+    parser.add_argument("--seed", type=int, help="seed for platform generation (random by default)")
+    parser.add_argument("--assets", metavar="DIR",
+                        help=f"directory holding Images/ and Sounds/ (default: ${ASSETS_ENV}, else next to this file)")
+    parser.add_argument("--record", metavar="FILE", help="record this run's inputs to FILE")
+    parser.add_argument("--replay", metavar="FILE", help="play back a recorded run")
+    parser.add_argument("--resume-at", type=int, default=0, metavar="TICK",
+                        help="with --replay, simulate up to TICK without drawing before showing it")
+    parser.add_argument("--profile", action="store_true", help="start with the profiler overlay shown (F3)")
+    parser.add_argument("--trace", metavar="FILE", help="write a Chrome trace of every frame's phases to FILE")
+    parser.add_argument("--fps", type=int, default=DEFAULT_FPS,
+                        help=f"frame rate cap, e.g. 120 or 144; 0 for uncapped (default: {DEFAULT_FPS})")
+    parser.add_argument("--vsync", action="store_true", help="sync buffer swaps to the display's refresh")
+    parser.add_argument("--render-scale", type=float, default=1.0, metavar="SCALE",
+                        help="draw the world at SCALE times the screen resolution, e.g. 0.75 (default: 1)")
+    parser.add_argument("--target-ms", type=float, metavar="MS",
+                        help="adjust the render scale to keep the GPU time of a frame under MS")
+    args = parser.parse_args(argv)
+    if args.seed is not None and not -2**63 <= args.seed < 2**63:
+        parser.error("--seed must fit in a signed 64-bit integer, as replays store it")
+    if args.render_scale <= 0:
+        parser.error("--render-scale must be positive")
+    return args
+
+def main(argv=None):
+    global state, recording, playback, pacer, render_scaler
+
+    args = parse_args(argv)
+    if args.replay:
+        playback = load_replay(args.replay)
+        seed = playback.seed
+    else:
+        seed = args.seed if args.seed is not None else random.randrange(2**63)
 
-    last_time = time.time()
+    if not glfw.init():
+        sys.exit()
+    window = glfw.create_window(WINDOW_WIDTH, WINDOW_HEIGHT, "Icy Tower", None, None)
+    if not window:
+        glfw.terminate()
+        sys.exit()
+    glfw.make_context_current(window)
+    glfw.swap_interval(1 if args.vsync else 0)
+    init_gl()
+    if args.render_scale != 1.0 or args.target_ms:
+        render_scaler = RenderScaler(args.render_scale, args.target_ms)
+    fit_viewport(*glfw.get_framebuffer_size(window))
+    glfw.set_framebuffer_size_callback(window, framebuffer_resized)
+
+    # Load textures and sounds behind the loading screen
+    loader = AssetLoader()
+    start_loading(loader, asset_root(args.assets))
+    if not run_loading_screen(window, loader):
+        glfw.terminate()
+        audio.shutdown()
+        return
+    init_text()
+
+    state = GameState(seed=seed)
+    # Tower chunks are generated by prefetch(), or inside step() when it falls behind
+    state.stream.generate_chunk = profiler.wrap("generate", state.stream.generate_chunk)
+    if playback is not None and args.resume_at > 0:
+        # Skip ahead without drawing or sound; recording keeps the skipped inputs
+        fast_forward(playback, state, args.resume_at)
+        update_game_textures()
+    if args.record:
+        recording = Replay(seed, playback.inputs[:state.tick] if playback else b"")
+
+    if args.profile:
+        toggle_profiler_overlay()
+    if args.trace:
+        profiler.start_trace(args.trace)
+    overlay_key_down = False
 
     # Start gameplay music immediately
-    game_play_sound.play(loops=-1)
+    play_music(GAME_PLAY_MUSIC)
+
+    pacer = FramePacer(args.fps or None, args.vsync, refresh_rate())
+    input_queue.attach(window)
+    last_time = time.perf_counter()
+    accumulator = 0.0
+    prev_x, prev_y, prev_camera_y = state.x, state.y, state.camera_y
 
     while not glfw.window_should_close(window):
-        current_time = time.time()
+        profiler.begin_frame()
+        profiler.begin("poll")
+        glfw.poll_events()
+        profiler.end()
+        # Read after polling, so every event just delivered is stamped before
+        # the ticks of this frame and applied in them
+        current_time = time.perf_counter()
         dt = current_time - last_time
         last_time = current_time
-        glfw.poll_events()
-        glClear(GL_COLOR_BUFFER_BIT)
 
-        # Start game on first space press
-        if not game_started:
-            if glfw.get_key(window, glfw.KEY_SPACE) == glfw.PRESS:
-                game_started = True
-                y_pos = ground_platform.y + ground_platform.height + char_height/2
-                y_velocity = 0
-                is_jumping = False
-
-        # Movement: only if not fallen
-        if not fall_detected:
-            moving = update_movement(window)
-        else:
-            moving = False
-            if not hasattr(main, "game_over_played"):
-                game_over_sound.play()
-                main.game_over_played = True
-                game_play_sound.stop()
-
-        # Physics & gameplay
-        if game_started and not fall_detected:
-            y_velocity += gravity
-            y_pos += y_velocity
-
-            landed = check_platform_collision()
-            if not landed and y_pos <= ground_y + char_height/2:
-                y_pos = ground_y + char_height/2
-                y_velocity = 0
-                is_jumping=False
-
-            if glfw.get_key(window, glfw.KEY_SPACE) == glfw.PRESS and not is_jumping and is_character_on_solid_ground():
-                y_velocity = jump_speed
-                is_jumping = True
-                jump_sound.play() 
-
-            camera_y += camera_speed
-            threshold = WINDOW_HEIGHT * 0.6
-            if y_pos > camera_y + threshold:
-                camera_y = y_pos - threshold
-
-            if y_pos + char_height/2 < camera_y:
-                fall_detected = True
-                if not hasattr(main, "game_over_played"):
-                    game_over_sound.play()
-                    game_play_sound.stop()
-                    main.game_over_played = True
-
-
-        # Texture update
-        if is_jumping:
-            current_texture = jump_texture
-        elif moving or bounce_effect:
-            current_texture = walk_texture
-        else:
-            current_texture = idle_texture
-
-        # Generate platforms above
-        top_needed = camera_y + WINDOW_HEIGHT*2
-        if len(platforms)==0 or max(p.y for p in platforms) < top_needed:
-            generate_platforms(max([p.y for p in platforms]) if platforms else 0, top_needed)
-
-        # Draw world
-        glPushMatrix()
-        glTranslatef(0, -camera_y, 0)
-        draw_background()
-        draw_walls()
-        for p in platforms:
-            if p.y+p.height >= camera_y-100 and p.y<=camera_y+WINDOW_HEIGHT+200:
-                p.draw()
-        draw_sprite(x_pos, y_pos, current_texture, scale=50, flip_x=flip)
-        glPopMatrix()
+        # Run as many fixed ticks as the elapsed time covers
+        accumulator += min(dt, MAX_FRAME_TIME)
+        while accumulator >= SIM_DT:
+            accumulator -= SIM_DT
+            prev_x, prev_y, prev_camera_y = state.x, state.y, state.camera_y
+            profiler.begin("update")
+            update_game(current_time - accumulator)  # the real time this tick ends at
+            profiler.end()
+
+        # Generate the tower ahead of the camera in small slices, never all at once
+        profiler.begin("prefetch")
+        state.prefetch()
+        profiler.end()
+
+        # Draw between the last two ticks
+        alpha = accumulator / SIM_DT
+        draw_x = prev_x + (state.x - prev_x) * alpha
+        draw_y = prev_y + (state.y - prev_y) * alpha
+        view_y = prev_camera_y + (state.camera_y - prev_camera_y) * alpha
+
+        profiler.begin("draw")
+        if render_scaler is not None:
+            render_scaler.begin_frame()
+        draw_frame(draw_x, draw_y, view_y)
+        count_frame_stats()
+        profiler.begin("overlay")
+        draw_profiler_overlay()
+        profiler.end()
+        if render_scaler is not None and render_scaler.end_frame():
+            update_band_scale()
+        profiler.end()
 
-# ==================== GAME OVER SCREEN ====================
-        if fall_detected:
-            glMatrixMode(GL_MODELVIEW)
-            glPushMatrix()
-            glLoadIdentity()
-
-            glEnable(GL_TEXTURE_2D)
-            glBindTexture(GL_TEXTURE_2D, game_over_texture)
-            glColor3f(1, 1, 1)
-
-            w = 400
-            h = 200
-            x = WINDOW_WIDTH // 2
-            y = WINDOW_HEIGHT // 2
-
-            glBegin(GL_QUADS)
-            glTexCoord2f(0, 0); glVertex2f(x - w/2, y - h/2)
-            glTexCoord2f(1, 0); glVertex2f(x + w/2, y - h/2)
-            glTexCoord2f(1, 1); glVertex2f(x + w/2, y + h/2)
-            glTexCoord2f(0, 1); glVertex2f(x - w/2, y + h/2)
-            glEnd()
-
-            glBindTexture(GL_TEXTURE_2D, 0)
-            glDisable(GL_TEXTURE_2D)
-
-            glPopMatrix()
-            
-        draw_score()
         if glfw.get_key(window, glfw.KEY_ESCAPE) == glfw.PRESS:
             glfw.set_window_should_close(window, True)
+        f3_down = glfw.get_key(window, glfw.KEY_F3) == glfw.PRESS
+        if f3_down and not overlay_key_down:
+            toggle_profiler_overlay()
+        overlay_key_down = f3_down
 
+        profiler.begin("swap")
         glfw.swap_buffers(window)
-        time.sleep(max(0,1/60 - dt))
+        input_queue.presented()
+        profiler.end()
+        profiler.begin("sleep")
+        pacer.wait(glfw.poll_events)
+        profiler.end()
+        profiler.end_frame()
     glfw.terminate()
+    audio.shutdown()
+    profiler.close_trace()
+    print(pacer.summary())
+    print(input_queue.summary())
+
+    if recording is not None:
+        recording.score = state.score
+        recording.save(args.record)
+        print(f"Recorded {len(recording)} ticks (seed {seed}) to {args.record}")
 
 if __name__=="__main__":
     main()
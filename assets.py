@@ -0,0 +1,217 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+
+import numpy as np
+
+from texture_atlas import AtlasBuilder, AtlasRegion, TextureAtlas, load_image
+
+# ==================== Asset Root ====================
+# The directory holding Images/ and Sounds/: given explicitly (--assets),
+# else $ICY_TOWER_ASSETS, else the directory this file is in. Nothing
+# depends on the working directory.
+ASSETS_ENV = "ICY_TOWER_ASSETS"
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def asset_root(root=None):
+    return os.path.abspath(root or os.environ.get(ASSETS_ENV) or PACKAGE_DIR)
+
+
+def asset_path(*parts, root=None):
+    return os.path.join(asset_root(root), *parts)
+
+
+# ==================== Sprites ====================
+# name, file in the images directory, brightness, tiled
+SPRITES = [
+    ("background", "gameBack.png", 1.5, True),
+    ("wall", "wall.png", 1.0, True),
+    ("bar_left", "bar_l1.png", 1.0, False),
+    ("bar_middle", "bar_m1.png", 1.0, True),
+    ("bar_right", "bar_r1.png", 1.0, False),
+    ("ground", "bar_m1.png", 1.0, True),
+    ("idle", "character1_0.gif", 1.0, False),
+    ("walk", "character1_1.gif", 1.0, False),
+    ("jump", "character1_3.png", 1.0, False),
+    ("game_over", "GameOver.png", 1.0, False),
+]
+
+
+def sprite_builder(images_dir):
+    builder = AtlasBuilder()
+    for name, filename, brightness, wrap in SPRITES:
+        builder.add(name, os.path.join(images_dir, filename), brightness, wrap=wrap)
+    return builder
+
+
+# ==================== Atlas Cache ====================
+# Decoding, flipping, brightening and packing the sprites is done once; the
+# finished atlas pages (upload-ready RGBA) and regions are stored in a single
+# file next to the images. On later starts the file is memory-mapped and the
+# pages are uploaded straight from the mapping. The file carries the
+# builder's cache_key(), so editing any image or load setting rebuilds it.
+#
+#   header | region index (JSON) | page 0 pixels | page 1 pixels | ...
+#
+#   python assets.py build --images Images     prebuild, e.g. for a deployment image
+#   python assets.py check --images Images     say whether the cache is current
+
+CACHE_MAGIC = b"ICYA"
+CACHE_VERSION = 1
+CACHE_HEADER = struct.Struct("<4sH32sI")  # magic, version, key, index length
+CACHE_ALIGN = 64
+CACHE_FILENAME = "atlas.cache"
+
+
+def default_cache_path(images_dir):
+    return os.path.join(images_dir, CACHE_FILENAME)
+
+
+def _align(offset):
+    return (offset + CACHE_ALIGN - 1) // CACHE_ALIGN * CACHE_ALIGN
+
+
+def write_cache(path, key, atlas):
+    # Written to a temporary file and renamed over the old one, so a reader
+    # never sees half a cache
+    regions = {name: [r.page, r.u0, r.v0, r.u1, r.v1, r.width, r.height] for name, r in atlas.regions.items()}
+    pages = []
+    offset = 0  # from the start of the pixel data
+    for width, height, _ in atlas.pages:
+        pages.append([width, height, offset])
+        offset = _align(offset + width*height*4)
+    index = json.dumps({"pages": pages, "regions": regions}).encode()
+    data_start = _align(CACHE_HEADER.size + len(index))
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(CACHE_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, key, len(index)))
+        f.write(index)
+        for (width, height, data), (_, _, start) in zip(atlas.pages, pages):
+            f.write(b"\0" * (data_start + start - f.tell()))
+            f.write(bytes(data))
+    os.replace(tmp, path)
+
+
+def read_cache(path, key):
+    # The cached TextureAtlas, its pages backed by the mapping, or None if
+    # the file is missing, from another version or built from other sources
+    try:
+        with open(path, "rb") as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    if len(mapping) < CACHE_HEADER.size:
+        return None
+    magic, version, cached_key, index_len = CACHE_HEADER.unpack_from(mapping)
+    if magic != CACHE_MAGIC or version != CACHE_VERSION or cached_key != key:
+        return None
+
+    # A corrupt or truncated index means rebuilding, like a bad header
+    try:
+        index = json.loads(mapping[CACHE_HEADER.size:CACHE_HEADER.size + index_len])
+        data_start = _align(CACHE_HEADER.size + index_len)
+        pages = []
+        for width, height, offset in index["pages"]:
+            offset += data_start
+            if offset + width*height*4 > len(mapping):
+                return None
+            # A view into the mapping: no copy until glTexImage2D reads it
+            pages.append((width, height, np.frombuffer(mapping, np.uint8, width*height*4, offset)))
+        regions = {name: AtlasRegion(*r) for name, r in index["regions"].items()}
+    except (ValueError, KeyError, TypeError):
+        return None
+    return TextureAtlas(pages, regions)
+
+
+def load_atlas(images_dir, cache_path=None):
+    # The sprite atlas, from the cache when it is current; otherwise built
+    # from the images and cached for next time
+    cache_path = cache_path or default_cache_path(images_dir)
+    builder = sprite_builder(images_dir)
+    key = builder.cache_key()
+    atlas = read_cache(cache_path, key)
+    if atlas is not None:
+        return atlas
+
+    atlas = builder.build()
+    try:
+        write_cache(cache_path, key, atlas)
+    except OSError as e:
+        print(f"Failed to write asset cache: {cache_path}\n   {e}")
+    return atlas
+
+
+def load_atlas_async(loader, images_dir, on_ready, cache_path=None):
+    # Same as load_atlas() on an AssetLoader: the cache is checked on a
+    # worker, and on a miss every image is decoded on its own worker before
+    # packing. on_ready(atlas) runs on the thread polling the loader.
+    cache_path = cache_path or default_cache_path(images_dir)
+    builder = sprite_builder(images_dir)
+    sources = builder.sources()
+    decoded = {}
+
+    def check_cache():
+        key = builder.cache_key()
+        return key, read_cache(cache_path, key)
+
+    def pack(key):
+        atlas = builder.build(decoded)
+        try:
+            write_cache(cache_path, key, atlas)
+        except OSError as e:
+            print(f"Failed to write asset cache: {cache_path}\n   {e}")
+        return atlas
+
+    def cache_checked(result):
+        key, atlas = result
+        if atlas is not None:
+            on_ready(atlas)
+            return
+        for source in sources:
+            loader.submit(load_image, *source, on_done=lambda img, source=source: image_loaded(key, source, img))
+
+    def image_loaded(key, source, img):
+        decoded[source] = img
+        if len(decoded) == len(sources):
+            loader.submit(pack, key, on_done=on_ready)
+
+    loader.submit(check_cache, on_done=cache_checked)
+
+
+# ==================== Command Line ====================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and check the preprocessed sprite atlas cache.")
+    parser.add_argument("command", choices=("build", "check"))
+    parser.add_argument("--images", default=asset_path("Images"),
+                        help=f"images directory (default: Images/ under ${ASSETS_ENV} or next to this file)")
+    parser.add_argument("--cache", help=f"cache file (default: IMAGES/{CACHE_FILENAME})")
+    args = parser.parse_args(argv)
+
+    cache_path = args.cache or default_cache_path(args.images)
+    builder = sprite_builder(args.images)
+    key = builder.cache_key()
+
+    if args.command == "check":
+        current = read_cache(cache_path, key) is not None
+        print(f"{cache_path}: {'current' if current else 'missing or stale'}")
+        raise SystemExit(0 if current else 1)
+
+    start = time.perf_counter()
+    atlas = builder.build()
+    write_cache(cache_path, key, atlas)
+    size = os.path.getsize(cache_path)
+    print(f"{cache_path}: {len(atlas.regions)} sprites on {len(atlas.pages)} page(s), "
+          f"{size / 1024:.0f} KiB, built in {time.perf_counter() - start:.2f} s")
+    missing = [name for name, *_ in SPRITES if name not in atlas.regions]
+    if missing:
+        print(f"missing images: {', '.join(missing)}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import time
+
+# ==================== Audio ====================
+# Background music streams from disk through pygame.mixer.music, a few
+# buffers at a time, instead of sitting decoded in memory. Short effects are
+# decoded Sounds played on a fixed pool of mixer channels: each effect has a
+# priority and a voice limit, and when every channel is busy the lowest
+# priority, oldest voice is cut off (stolen) for the new one, or the new one
+# is dropped if everything playing matters more. Rapid jumping therefore
+# restarts the jump sound instead of piling up channels.
+#
+# Everything degrades to silence: no audio device, a missing or unreadable
+# file, or an effect that never loaded just means nothing plays.
+
+MIXER_FREQUENCY = 44100
+MIXER_BUFFER = 512     # samples per mixer buffer; small keeps effects in sync with the action
+EFFECT_CHANNELS = 8
+
+PRIORITY_LOW = 0
+PRIORITY_NORMAL = 1
+PRIORITY_HIGH = 2
+
+
+class Effect:
+    __slots__ = ("sound", "priority", "max_voices")
+
+    def __init__(self, sound, priority, max_voices):
+        self.sound = sound
+        self.priority = priority
+        self.max_voices = max_voices
+
+
+class Voice:
+    __slots__ = ("channel", "effect", "priority", "started")
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.effect = None
+        self.priority = PRIORITY_LOW
+        self.started = 0.0
+
+    @property
+    def busy(self):
+        return self.effect is not None and self.channel.get_busy()
+
+
+def decode_sound(path):
+    # Safe to run on a loader thread once the mixer is up; None on failure
+    import pygame
+    try:
+        return pygame.mixer.Sound(path)
+    except (pygame.error, OSError) as e:
+        print(f"Failed to load sound: {path}\n   {e}")
+        return None
+
+
+class Audio:
+    def __init__(self, channels=EFFECT_CHANNELS):
+        self.channels = channels
+        self.enabled = False
+        self.effects = {}  # name -> Effect
+        self.voices = []
+        self.stolen = 0    # voices cut off for a new effect
+        self.dropped = 0   # effects not played because every voice mattered more
+
+    def init(self):
+        if self.enabled:
+            return True
+        try:
+            import pygame
+            pygame.mixer.init(frequency=MIXER_FREQUENCY, buffer=MIXER_BUFFER)
+            pygame.mixer.set_num_channels(self.channels)
+        except Exception as e:
+            print(f"Audio disabled: {e}")
+            return False
+        self.voices = [Voice(pygame.mixer.Channel(i)) for i in range(self.channels)]
+        self.enabled = True
+        return True
+
+    def shutdown(self):
+        if not self.enabled:
+            return
+        import pygame
+        pygame.mixer.music.stop()
+        pygame.mixer.quit()
+        self.enabled = False
+        self.voices = []
+
+    # ==================== Effects ====================
+    def add_effect(self, name, sound, volume=1.0, priority=PRIORITY_NORMAL, max_voices=2):
+        if sound is None:
+            return
+        sound.set_volume(volume)
+        self.effects[name] = Effect(sound, priority, max_voices)
+
+    def play(self, name):
+        effect = self.effects.get(name)
+        if not self.enabled or effect is None:
+            return False
+
+        busy = [v for v in self.voices if v.busy]
+        same = [v for v in busy if v.effect is effect]
+        if len(same) >= effect.max_voices:
+            voice = min(same, key=lambda v: v.started)
+            self.stolen += 1
+        elif len(busy) < len(self.voices):
+            voice = next(v for v in self.voices if not v.busy)
+        else:
+            voice = min(busy, key=lambda v: (v.priority, v.started))
+            if voice.priority > effect.priority:
+                self.dropped += 1
+                return False
+            self.stolen += 1
+
+        voice.channel.play(effect.sound)
+        voice.effect = effect
+        voice.priority = effect.priority
+        voice.started = time.perf_counter()
+        return True
+
+    # ==================== Music ====================
+    def play_music(self, path, volume=1.0, loops=-1):
+        if not self.enabled:
+            return False
+        import pygame
+        try:
+            pygame.mixer.music.load(path)
+        except (pygame.error, OSError) as e:
+            print(f"Failed to load music: {path}\n   {e}")
+            pygame.mixer.music.stop()
+            return False
+        pygame.mixer.music.set_volume(volume)
+        pygame.mixer.music.play(loops=loops)
+        return True
+
+    def stop_music(self):
+        if self.enabled:
+            import pygame
+            pygame.mixer.music.stop()
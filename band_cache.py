@@ -0,0 +1,106 @@
+import math
+from OpenGL.GL import *
+from render_target import RenderTarget
+
+# ==================== Tower Band Cache ====================
+# The world behind the character (background, walls, platforms) never changes
+# once generated, so it is drawn in horizontal bands of `band_height` world
+# pixels, each into its own texture, once. A frame then composites the two or
+# three bands on screen as one quad each, however many platforms they hold.
+# Bands are evicted as soon as they scroll out below the view and their render
+# targets reused for the next bands coming in at the top.
+#
+# draw_band(k) queues everything between y = k*band_height and
+# (k+1)*band_height on the batch; anything sticking out of the band is cut off
+# by the render target and drawn again with the neighbouring band. A band is
+# only cached once the world is complete up to its top (complete_to);
+# until then it is drawn directly every frame.
+#
+# Band textures hold `scale` texels per world pixel, so rendering at a
+# higher resolution than the window (e.g. video export) stays sharp.
+#
+# Without framebuffer objects the cache switches itself off and every band is
+# drawn directly.
+
+MAX_BANDS = 4
+
+
+class BandCache:
+    def __init__(self, draw_band, width, band_height, max_bands=MAX_BANDS, scale=1.0):
+        self.draw_band = draw_band
+        self.width = width
+        self.band_height = band_height
+        self.scale = scale
+        self.max_bands = max_bands
+        self.enabled = True
+        self.bands = {}   # band index -> RenderTarget
+        self._free = []
+        self.renders = 0  # bands rendered into a texture since reset_stats()
+
+    def reset_stats(self):
+        self.renders = 0
+
+    def visible(self, view_y, view_height):
+        first = math.floor(view_y / self.band_height)
+        last = math.ceil((view_y + view_height) / self.band_height) - 1
+        return range(first, last + 1)
+
+    def draw(self, batch, view_y, view_height, complete_to):
+        # Queues the bands covering view_y..view_y + view_height on the batch
+        bands = self.visible(view_y, view_height)
+        for k in list(self.bands):
+            if k not in bands:
+                self._free.append(self.bands.pop(k))
+
+        # Render missing bands first: each render flushes the batch into its
+        # texture, so nothing for the screen may be queued yet
+        for k in bands:
+            if self.enabled and k not in self.bands and (k + 1)*self.band_height <= complete_to:
+                self._render(batch, k)
+
+        for k in bands:
+            target = self.bands.get(k)
+            if target is None:
+                self.draw_band(k)
+            else:
+                batch.draw_quad(target.texture, 0, k*self.band_height, self.width, (k + 1)*self.band_height)
+
+    def _render(self, batch, k):
+        target = self._free.pop() if self._free else None
+        if target is None and len(self.bands) < self.max_bands:
+            try:
+                target = RenderTarget(round(self.width*self.scale), round(self.band_height*self.scale))
+            except Exception as e:
+                print(f"Band cache disabled: {e}")
+                self.enabled = False
+                return
+        if target is None:
+            return
+
+        target.begin(0, k*self.band_height, self.width, (k + 1)*self.band_height)
+        # Keep the texture's alpha at 1 under translucent edges, so the
+        # composited band is as opaque as the scene it was drawn from
+        glBlendFuncSeparate(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA, GL_ONE, GL_ONE_MINUS_SRC_ALPHA)
+        glClear(GL_COLOR_BUFFER_BIT)
+        self.draw_band(k)
+        batch.flush()
+        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+        target.end()
+        self.bands[k] = target
+        self.renders += 1
+
+    def set_scale(self, scale):
+        if scale != self.scale:
+            self.delete()
+            self.scale = scale
+
+    def invalidate(self):
+        # Forget every band, e.g. after the world or its textures changed
+        self._free.extend(self.bands.values())
+        self.bands.clear()
+
+    def delete(self):
+        self.invalidate()
+        for target in self._free:
+            target.delete()
+        self._free = []
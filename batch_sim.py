@@ -0,0 +1,385 @@
+import math
+import random
+import numpy as np
+from game_state import (WINDOW_WIDTH, WINDOW_HEIGHT, WALL_WIDTH, CHAR_WIDTH, CHAR_HEIGHT,
+                        GROUND_Y, GROUND_HEIGHT, PLATFORM_HEIGHT, PLATFORM_PRUNE_MARGIN,
+                        CAMERA_THRESHOLD, SPEED, JUMP_SPEED, GRAVITY, CAMERA_SPEED_BASE,
+                        CAMERA_SPEED_STEP, JUMPS_PER_SPEEDUP, PLATFORM_GAP_RANGE,
+                        PLATFORM_WIDTH_RANGE, BOUNCE_SPEED, BOUNCE_TICKS,
+                        INPUT_LEFT, INPUT_RIGHT, INPUT_JUMP, PlatformStream)
+
+# ==================== Batch Simulator ====================
+# Runs N independent games side by side as NumPy arrays, one tick per step().
+# The rules are the ones in GameState.step(), applied to all games at once,
+# and every game gets its own PlatformStream over random.Random(seed), so
+# game i plays out exactly like GameState(seed=seeds[i]) given the same inputs.
+#
+# Each game keeps a window of at most `window` platforms, sorted by y, in
+# (N, window) arrays. Unused and pruned slots hold NaN, which fails every
+# comparison. By default the window is sized from the smallest gap a stream
+# can produce, so it holds every platform between the prune line and the top
+# of the generated tower (three screens at most).
+# Platform generation is still plain Python, but only runs for the few games
+# whose camera crossed their top platform on a given tick.
+
+WINDOW_SLACK = 8  # slots beyond the most platforms the window's span can hold
+
+
+def window_for(min_gap):
+    span = 3*WINDOW_HEIGHT + PLATFORM_PRUNE_MARGIN + PLATFORM_HEIGHT
+    return math.ceil(span / max(1, min_gap)) + WINDOW_SLACK
+
+
+class BatchSimulator:
+    def __init__(self, seeds, window=None, speed=SPEED, jump_speed=JUMP_SPEED,
+                 gravity=GRAVITY, camera_speed_base=CAMERA_SPEED_BASE,
+                 camera_speed_step=CAMERA_SPEED_STEP, jumps_per_speedup=JUMPS_PER_SPEEDUP,
+                 gap_range=PLATFORM_GAP_RANGE, width_range=PLATFORM_WIDTH_RANGE):
+        self.seeds = list(seeds)
+        n = self.n = len(self.seeds)
+        self.gap_range = gap_range
+        self.width_range = width_range
+
+        # Difficulty may be a scalar or one value per game
+        self.speed = self._per_game(speed)
+        self.jump_speed = self._per_game(jump_speed)
+        self.gravity = self._per_game(gravity)
+        self.camera_speed_step = self._per_game(camera_speed_step)
+        self.jumps_per_speedup = np.broadcast_to(np.asarray(jumps_per_speedup, dtype=np.int64), (n,)).copy()
+
+        # Character
+        self.x = np.full(n, WINDOW_WIDTH // 2, dtype=np.float64)
+        self.y = np.full(n, GROUND_Y + GROUND_HEIGHT + CHAR_HEIGHT/2, dtype=np.float64)
+        self.y_velocity = np.zeros(n)
+        self.is_jumping = np.zeros(n, dtype=bool)
+        self.flip = np.zeros(n, dtype=bool)
+        self.moving = np.zeros(n, dtype=bool)
+
+        # Game
+        self.tick = 0
+        self.game_started = np.zeros(n, dtype=bool)
+        self.fall_detected = np.zeros(n, dtype=bool)
+        self.successful_jumps = np.zeros(n, dtype=np.int64)
+        self.camera_speed = self._per_game(camera_speed_base)
+        self.camera_y = np.zeros(n)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.fall_tick = np.full(n, -1, dtype=np.int64)  # tick on which each game ended
+
+        # Bounce effect
+        self.bounce_effect = np.zeros(n, dtype=bool)
+        self.bounce_timer = np.zeros(n, dtype=np.int64)
+        self.bounce_direction = np.zeros(n, dtype=np.int64)
+
+        # What happened on the last tick, per game (EVENT_JUMP / EVENT_LAND)
+        self.jumped = np.zeros(n, dtype=bool)
+        self.landed = np.zeros(n, dtype=bool)
+
+        # Platform window
+        self.streams = [PlatformStream(random.Random(seed), width_range, gap_range, self.jump_speed[i],
+                                       self.gravity[i], self.speed[i]) for i, seed in enumerate(self.seeds)]
+        if window is None:
+            # Gaps are capped at the highest jump, which can be below gap_range
+            window = window_for(min([gap_range[0]] + [stream.max_gap for stream in self.streams]))
+        self.window = window
+        self.plat_x = np.full((n, window), np.nan)
+        self.plat_y = np.full((n, window), np.nan)
+        self.plat_w = np.full((n, window), np.nan)
+        self.plat_h = np.full((n, window), np.nan)
+        self.plat_count = np.zeros(n, dtype=np.int64)
+        self.plat_x[:, 0] = 0
+        self.plat_y[:, 0] = GROUND_Y
+        self.plat_w[:, 0] = WINDOW_WIDTH
+        self.plat_h[:, 0] = GROUND_HEIGHT
+        self.plat_count[:] = 1
+        self.top_y = np.full(n, float(GROUND_Y))
+        for i in range(n):
+            self._generate(i, WINDOW_HEIGHT*3)
+
+    def _per_game(self, value):
+        return np.broadcast_to(np.asarray(value, dtype=np.float64), (self.n,)).copy()
+
+    @property
+    def alive(self):
+        return ~self.fall_detected
+
+    # ==================== Platform Window ====================
+    def _generate(self, i, max_y):
+        count = self.plat_count[i]
+        # Squeeze out the slots _prune() blanked before appending
+        keep = ~np.isnan(self.plat_y[i, :count])
+        if not keep.all():
+            kept = keep.sum()
+            for arr in (self.plat_x, self.plat_y, self.plat_w, self.plat_h):
+                arr[i, :kept] = arr[i, :count][keep]
+                arr[i, kept:count] = np.nan
+            count = kept
+
+        new = self.streams[i].take(max_y)
+        if count + len(new) > self.window:
+            raise ValueError(f"platform window of {self.window} is too small for game {i}")
+        for x, y, width in new:
+            self.plat_x[i, count] = x
+            self.plat_y[i, count] = y
+            self.plat_w[i, count] = width
+            self.plat_h[i, count] = PLATFORM_HEIGHT
+            count += 1
+        if new:
+            self.top_y[i] = new[-1][1]
+        self.plat_count[i] = count
+        return len(new)
+
+    def platforms(self, i):
+        # (x, y, width, height) of game i's current window, lowest first
+        count = self.plat_count[i]
+        return [p for p in zip(self.plat_x[i, :count], self.plat_y[i, :count],
+                               self.plat_w[i, :count], self.plat_h[i, :count]) if not np.isnan(p[1])]
+
+    def _first_platform(self, rows, reach):
+        # Lowest platform overlapping each game in `rows` horizontally whose top
+        # is within [player_bottom - reach, player_bottom + 10], as (hit mask, top)
+        x = self.x[rows, None]
+        player_bottom = self.y[rows, None] - CHAR_HEIGHT/2
+        px = self.plat_x[rows]
+        top = self.plat_y[rows] + self.plat_h[rows]
+        hit = ((x - CHAR_WIDTH/2 < px + self.plat_w[rows]) & (x + CHAR_WIDTH/2 > px) &
+               (player_bottom >= top - 10) & (player_bottom <= top + reach))
+        any_hit = hit.any(axis=1)
+        first = hit.argmax(axis=1)
+        return any_hit, top[np.arange(len(rows)), first]
+
+    # ==================== Tick ====================
+    def step(self, inputs):
+        inputs = np.broadcast_to(np.asarray(inputs, dtype=np.int64), (self.n,))
+        self.tick += 1
+        jump_held = (inputs & INPUT_JUMP) != 0
+        self.jumped[:] = False
+        self.landed[:] = False
+
+        # Start game on first jump press
+        start = ~self.game_started & jump_held
+        self.game_started |= start
+        self.y[start] = GROUND_Y + GROUND_HEIGHT + CHAR_HEIGHT/2
+        self.y_velocity[start] = 0
+        self.is_jumping[start] = False
+
+        start_x, start_y = self.x.copy(), self.y.copy()
+        self._update_movement(inputs)
+
+        active = self.game_started & ~self.fall_detected
+        self.y_velocity[active] += self.gravity[active]
+        self.y[active] += self.y_velocity[active]
+
+        landed = self._check_platform_collision(active & (self.y_velocity < 0), start_x, start_y)
+        on_ground_floor = active & ~landed & (self.y <= GROUND_Y + CHAR_HEIGHT/2)
+        self.y[on_ground_floor] = GROUND_Y + CHAR_HEIGHT/2
+        self.y_velocity[on_ground_floor] = 0
+        self.is_jumping[on_ground_floor] = False
+
+        want_jump = active & jump_held & ~self.is_jumping
+        jump = self._on_solid_ground(want_jump)
+        self.y_velocity[jump] = self.jump_speed[jump]
+        self.is_jumping[jump] = True
+        self.jumped = jump
+
+        self.camera_y[active] += self.camera_speed[active]
+        follow = active & (self.y > self.camera_y + CAMERA_THRESHOLD)
+        self.camera_y[follow] = self.y[follow] - CAMERA_THRESHOLD
+
+        fell = active & (self.y + CHAR_HEIGHT/2 < self.camera_y)
+        self.fall_detected |= fell
+        self.fall_tick[fell] = self.tick
+
+        top_needed = self.camera_y + WINDOW_HEIGHT*2
+        for i in np.flatnonzero(self.top_y < top_needed):
+            self._generate(i, top_needed[i])
+        self._prune()
+
+    def _prune(self):
+        # Blank out platforms that scrolled away, like PlatformStore.prune_below();
+        # the holes are compacted the next time the game generates
+        gone = self.plat_y + self.plat_h < (self.camera_y - PLATFORM_PRUNE_MARGIN)[:, None]
+        if gone.any():
+            self.plat_x[gone] = np.nan
+            self.plat_y[gone] = np.nan
+            self.plat_w[gone] = np.nan
+            self.plat_h[gone] = np.nan
+
+    def _update_movement(self, inputs):
+        alive = ~self.fall_detected
+
+        # Bounce effect
+        b = alive & self.bounce_effect & (self.bounce_timer > 0)
+        self.x[b] += (self.bounce_direction[b]*BOUNCE_SPEED) * (self.bounce_timer[b]/BOUNCE_TICKS)
+        self.bounce_timer[b] -= 1
+        done = b & (self.bounce_timer <= 0)
+        self.bounce_effect[done] = False
+        self.bounce_timer[done] = 0
+
+        bouncing = alive & self.bounce_effect
+        free = alive & ~bouncing
+        char_half = CHAR_WIDTH/2
+
+        right = free & ((inputs & INPUT_RIGHT) != 0)
+        self.x[right] += self.speed[right]
+        self.flip[right] = False
+        hit = right & (self.x > WINDOW_WIDTH - WALL_WIDTH - char_half)
+        self.x[hit] = WINDOW_WIDTH - WALL_WIDTH - char_half
+        self._start_bounce(hit, -1)
+
+        left = free & ((inputs & INPUT_LEFT) != 0)
+        self.x[left] -= self.speed[left]
+        self.flip[left] = True
+        hit = left & (self.x < WALL_WIDTH + char_half)
+        self.x[hit] = WALL_WIDTH + char_half
+        self._start_bounce(hit, 1)
+
+        self.moving = bouncing | right | left
+
+    def _start_bounce(self, mask, direction):
+        self.bounce_effect[mask] = True
+        self.bounce_timer[mask] = BOUNCE_TICKS
+        self.bounce_direction[mask] = direction
+
+    def _swept_contact(self, rows, start_x, start_y):
+        # game_state.swept_contact() against every platform of each game in
+        # `rows`, as (hit mask, top of the platform touched first)
+        x0 = start_x[rows, None]
+        bottom0 = start_y[rows, None] - CHAR_HEIGHT/2
+        dx = self.x[rows, None] - x0
+        dy = self.y_velocity[rows, None]
+        px = self.plat_x[rows]
+        top = self.plat_y[rows] + self.plat_h[rows]
+        left = px - CHAR_WIDTH/2
+        right = px + self.plat_w[rows] + CHAR_WIDTH/2
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = np.maximum((top + 20 - bottom0) / dy, 0.0)
+            t_exit = np.minimum((top - 10 - bottom0) / dy, 1.0)
+            t_left = (left - x0) / dx
+            t_right = (right - x0) / dx
+        sliding = dx != 0
+        t = np.where(sliding, np.maximum(t, np.minimum(t_left, t_right)), t)
+        beside = np.where(sliding, t < np.maximum(t_left, t_right), (left < x0) & (x0 < right))
+        t = np.where(beside & (t <= t_exit), t, np.inf)
+        first = t.argmin(axis=1)
+        return np.isfinite(t.min(axis=1)), top[np.arange(len(rows)), first]
+
+    def _check_platform_collision(self, candidates, start_x, start_y):
+        landed = np.zeros(self.n, dtype=bool)
+        rows = np.flatnonzero(candidates)
+        if not len(rows):
+            return landed
+        hit, top = self._swept_contact(rows, start_x, start_y)
+        rows = rows[hit]
+        landed[rows] = True
+        self.y[rows] = top[hit] + CHAR_HEIGHT/2
+        self.y_velocity[rows] = 0
+
+        scored = rows[self.is_jumping[rows]]
+        self.successful_jumps[scored] += 1
+        self.score[scored] += 1
+        speedup = scored[self.successful_jumps[scored] % self.jumps_per_speedup[scored] == 0]
+        self.camera_speed[speedup] += self.camera_speed_step[speedup]
+        self.landed[scored] = True
+
+        self.is_jumping[rows] = False
+        return landed
+
+    def _on_solid_ground(self, candidates):
+        # Same as GameState.is_on_solid_ground, including snapping y onto the surface
+        on_ground = np.zeros(self.n, dtype=bool)
+        floor = candidates & (self.y <= GROUND_Y + CHAR_HEIGHT/2)
+        self.y[floor] = GROUND_Y + CHAR_HEIGHT/2
+        on_ground |= floor
+
+        rows = np.flatnonzero(candidates & ~floor)
+        if len(rows):
+            hit, top = self._first_platform(rows, 10)
+            rows = rows[hit]
+            self.y[rows] = top[hit] + CHAR_HEIGHT/2
+            on_ground[rows] = True
+        return on_ground
+
+
+# ==================== Cross-Check ====================
+# Steps a BatchSimulator and one GameState per seed side by side on the same
+# inputs and compares every field (and the platforms) after every tick. The
+# greedy bot climbs; "mash" holds random key combinations for a few ticks at a
+# time, so walls, bounces and falls get exercised too.
+#
+#   python batch_sim.py --seeds 16 --ticks 10000
+
+CHECK_FIELDS = ("x", "y", "y_velocity", "is_jumping", "flip", "moving", "game_started", "fall_detected",
+                "successful_jumps", "camera_speed", "camera_y", "score", "bounce_effect", "bounce_timer",
+                "bounce_direction")
+MASH_HOLD = (1, 30)  # ticks a mashed key combination is held
+
+
+def mash_inputs(rngs, held, ticks_left):
+    # Per game: keep the current keys, or pick new ones once they ran out
+    for i, rng in enumerate(rngs):
+        if ticks_left[i] <= 0:
+            held[i] = rng.choice((0, INPUT_LEFT, INPUT_RIGHT, INPUT_JUMP, INPUT_LEFT | INPUT_JUMP,
+                                  INPUT_RIGHT | INPUT_JUMP))
+            ticks_left[i] = rng.randint(*MASH_HOLD)
+        ticks_left[i] -= 1
+    return held
+
+
+def compare_games(seeds, ticks, policy="greedy", **settings):
+    # Returns (seed, tick, what) of the first difference in each game that
+    # diverged; empty when the simulators agree
+    from game_state import GameState
+    from bots import greedy_bot
+
+    seeds = list(seeds)
+    sim = BatchSimulator(seeds, **settings)
+    scalar_settings = {k: v for k, v in settings.items() if k != "window"}
+    games = [GameState(seed=seed, **scalar_settings) for seed in seeds]
+    rngs = [random.Random(seed) for seed in seeds]
+    held = np.zeros(len(seeds), dtype=np.int64)
+    ticks_left = np.zeros(len(seeds), dtype=np.int64)
+
+    mismatches = {}
+    for tick in range(1, ticks + 1):
+        if policy == "greedy":
+            inputs = np.array([greedy_bot(game) for game in games], dtype=np.int64)
+        else:
+            inputs = mash_inputs(rngs, held, ticks_left).copy()
+        sim.step(inputs)
+        for i, game in enumerate(games):
+            if i in mismatches:
+                continue
+            game.step(int(inputs[i]))
+            for field in CHECK_FIELDS:
+                if getattr(game, field) != getattr(sim, field)[i]:
+                    mismatches[i] = (seeds[i], tick, f"{field}: {getattr(game, field)} != {getattr(sim, field)[i]}")
+                    break
+            else:
+                platforms = [(p.x, p.y, p.width, p.height) for p in game.platforms]
+                if platforms != sim.platforms(i):
+                    mismatches[i] = (seeds[i], tick, f"platforms: {len(platforms)} != {len(sim.platforms(i))}")
+        if sim.fall_detected.all():
+            break
+    return sorted(mismatches.values())
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Check that BatchSimulator plays exactly like GameState.")
+    parser.add_argument("--seeds", type=int, default=16, help="games per policy")
+    parser.add_argument("--ticks", type=int, default=10000)
+    parser.add_argument("--policy", choices=("greedy", "mash"), nargs="+", default=["greedy", "mash"])
+    args = parser.parse_args(argv)
+
+    failed = False
+    for policy in args.policy:
+        mismatches = compare_games(range(args.seeds), args.ticks, policy)
+        print(f"{policy}: {args.seeds - len(mismatches)}/{args.seeds} games identical")
+        for seed, tick, what in mismatches:
+            print(f"  seed {seed} differs at tick {tick}: {what}")
+        failed |= bool(mismatches)
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
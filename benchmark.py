@@ -0,0 +1,405 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+import offscreen
+from bots import greedy_bot
+from game_state import (GameState, CHAR_HEIGHT, WINDOW_WIDTH, WINDOW_HEIGHT, PLATFORM_PRUNE_MARGIN,
+                        PlatformStream)
+from platform_store import PlatformStore
+
+# ==================== Benchmarks ====================
+# Times the hot paths and writes the results as JSON, so two commits can be
+# compared. Three groups:
+#   physics   collision / ground checks against towers of 10 to 10000
+#             platforms, and platform generation over tall ranges
+#   render    the pieces of a frame on an offscreen GL context (EGL or
+#             OSMesa, software rasterizer, no window or GPU); skipped, with
+#             the reason in the output, when no context or game can be set up
+#   long-run  the greedy bot climbing with a still camera; step and frame
+#             cost sampled against tick, height and platform count
+#
+#   python benchmark.py --out before.json
+#   python benchmark.py --out after.json
+#   python benchmark.py --compare before.json after.json
+
+SCHEMA = 1
+GROUPS = ("physics", "render", "long-run")
+PLATFORM_COUNTS = (10, 100, 1000, 10000)
+GENERATE_HEIGHTS = (10_000, 100_000, 1_000_000)
+DEFAULT_REPEAT = 30
+DEFAULT_LONG_TICKS = 60 * 60 * 30  # half an hour of play
+DEFAULT_SAMPLE_EVERY = 600
+STUCK_TICKS = 60 * 20              # long-run games that stop climbing for this long are replaced
+DEFAULT_THRESHOLD = 10.0           # percent slower before --compare calls it a regression
+
+
+# ==================== Timing ====================
+def summarize(samples):
+    samples = np.asarray(samples, dtype=np.float64)
+    return {
+        "mean_us": float(samples.mean()),
+        "p50_us": float(np.percentile(samples, 50)),
+        "p95_us": float(np.percentile(samples, 95)),
+        "min_us": float(samples.min()),
+        "samples": len(samples),
+    }
+
+
+def measure(fn, repeat, number=1):
+    # Per-call microseconds over `repeat` samples of `number` back-to-back calls
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter_ns() - start) / number / 1000)
+    return summarize(samples)
+
+
+def play(state, ticks):
+    for _ in range(ticks):
+        if state.fall_detected:
+            break
+        state.step(greedy_bot(state))
+    return state
+
+
+# ==================== Physics ====================
+def tower(count, seed=0):
+    # A GameState holding at least `count` platforms; nothing gets pruned
+    # because step() is never called
+    state = GameState(seed=seed)
+    height = WINDOW_HEIGHT*3
+    while len(state.platforms) < count:
+        height *= 2
+        state.generate_platforms(height)
+    return state
+
+
+def bench_physics(repeat):
+    results = {}
+    for count in PLATFORM_COUNTS:
+        state = tower(count)
+        platforms = list(state.platforms)
+        p = platforms[len(platforms)//2]
+        top = p.y + p.height
+        params = {"platforms": len(platforms)}
+
+        def place(bottom, velocity, jumping):
+            state.x = p.x + p.width/2
+            state.y = bottom + CHAR_HEIGHT/2
+            state.y_velocity = velocity
+            state.is_jumping = jumping
+            state.events.clear()
+
+        def land():
+            place(top - 5, -5, True)
+            state.check_platform_collision(state.x, state.y + 5)
+
+        def miss():
+            place(top + 30, -5, True)  # above the platform, out of snapping range
+            state.check_platform_collision(state.x, state.y + 5)
+
+        def stand():
+            place(top, 0, False)
+            state.is_on_solid_ground()
+
+        for name, fn in (("check_platform_collision/hit", land), ("check_platform_collision/miss", miss),
+                         ("is_on_solid_ground", stand)):
+            results[f"physics/{name}/n={count}"] = dict(measure(fn, repeat, 1000), **params)
+
+    gen_repeat = max(3, repeat // 3)
+    for height in GENERATE_HEIGHTS:
+        count = len(PlatformStream(random.Random(0)).take(height))
+        params = {"height": height, "platforms": count}
+        results[f"physics/PlatformStream.take/h={height}"] = dict(
+            measure(lambda: PlatformStream(random.Random(0)).take(height), gen_repeat), **params)
+
+        state = GameState(seed=0)
+
+        def fill():
+            state.stream = PlatformStream(random.Random(0))
+            state.platforms = PlatformStore()
+            state.generate_platforms(height)
+
+        results[f"physics/GameState.generate_platforms/h={height}"] = dict(measure(fill, gen_repeat), **params)
+
+    # One prefetch chunk, the most generation a frame ever does
+    stream = PlatformStream(random.Random(0))
+    results["physics/PlatformStream.generate_chunk"] = measure(stream.generate_chunk, repeat, 100)
+    return results
+
+
+# ==================== Render ====================
+def setup_render(gl_platform):
+    # Returns (FinalProject module, context, None) or (None, None, reason)
+    try:
+        context = offscreen.create_context(WINDOW_WIDTH, WINDOW_HEIGHT, gl_platform)
+    except Exception as e:
+        return None, None, f"no offscreen {gl_platform} context: {e}"
+
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    try:
+        import FinalProject as game
+    except Exception as e:
+        context.release()
+        return None, None, f"FinalProject failed to load: {e}"
+
+    from assets import asset_path  # imports OpenGL, so only once the context exists
+    game.init_gl()
+    game.load_textures(asset_path("Images"))
+    game.init_text()
+    return game, context, None
+
+
+def timed_frame(game, state):
+    # One full frame of `state`, including the time the rasterizer needs to finish it
+    from OpenGL.GL import glFinish
+    game.state = state
+    game.update_game_textures()
+
+    def frame():
+        game.draw_frame(state.x, state.y, state.camera_y)
+        glFinish()
+    return frame
+
+
+def bench_render(game, repeat):
+    from OpenGL.GL import glClear, glFinish, glPushMatrix, glPopMatrix, glTranslatef, GL_COLOR_BUFFER_BIT
+
+    state = play(GameState(seed=0), 600)
+    frame = timed_frame(game, state)
+    view_y = state.camera_y
+    visible = state.platforms.query(view_y - PLATFORM_PRUNE_MARGIN, view_y + WINDOW_HEIGHT + 200)
+
+    def world(draw):
+        def run():
+            glClear(GL_COLOR_BUFFER_BIT)
+            glPushMatrix()
+            glTranslatef(0, -view_y, 0)
+            draw()
+            game.batch.flush()
+            glPopMatrix()
+            glFinish()
+        return run
+
+    def platforms():
+        for p in visible:
+            game.draw_platform(p)
+
+    def score():
+        game.draw_score()
+        glFinish()
+
+    def band_render():
+        # A band cache miss: the band redrawn into its texture
+        game.band_cache.invalidate()
+        game.draw_tower(view_y)
+        game.batch.flush()
+        glFinish()
+
+    def particles():
+        # A full particle system: one tick of movement and its draw call
+        system = game.particles
+        if system.count < system.capacity:
+            system.emit(WINDOW_WIDTH/2, view_y + WINDOW_HEIGHT/2, system.capacity, 4, life=10**6, gravity=0)
+        system.update()
+        world(system.draw)()
+
+    band = int(view_y // WINDOW_HEIGHT)
+    results = {}
+    for name, fn in (("draw_tower_band", world(lambda: game.draw_tower_band(band))),
+                     ("draw_platforms", world(platforms)),
+                     ("band_render", band_render),
+                     ("draw_score", score),
+                     ("frame", frame),
+                     ("particles", particles)):
+        fn()  # warm up: first use uploads vertex buffers
+        results[f"render/{name}"] = measure(fn, repeat, 10)
+    game.particles.clear()
+    results["render/frame"].update(platforms=len(visible), draw_calls=game.batch.draw_calls,
+                                   quads=game.batch.quads)
+    return results
+
+
+# ==================== Long Run ====================
+def bench_long_run(game, ticks, sample_every, seed=0):
+    # A still camera lets the bot climb as far as it can; when it falls, or
+    # stops getting higher for STUCK_TICKS, the next seed starts, and the
+    # samples say which game they are from
+    def new_game(k):
+        return GameState(seed=seed + k, camera_speed_base=0, camera_speed_step=0)
+
+    games = 0
+    state = new_game(games)
+    frame = timed_frame(game, state) if game else None
+    best_height = climbed_at = 0
+    series = []
+    step_samples = []
+    frame_samples = []
+    done = 0
+    while done < ticks:
+        window = []
+        for _ in range(min(sample_every, ticks - done)):
+            if state.camera_y > best_height:
+                best_height, climbed_at = state.camera_y, state.tick
+            if state.fall_detected or state.tick - climbed_at > STUCK_TICKS:
+                best_height = climbed_at = 0
+                games += 1
+                state = new_game(games)
+                frame = timed_frame(game, state) if game else None
+            inputs = greedy_bot(state)
+            start = time.perf_counter_ns()
+            state.step(inputs)
+            window.append((time.perf_counter_ns() - start) / 1000)
+        done += len(window)
+        step_samples.extend(window)
+
+        sample = {
+            "tick": done,
+            "game": games,
+            "game_tick": state.tick,
+            "height": state.camera_y,
+            "platforms": len(state.platforms),
+            "step_mean_us": float(np.mean(window)),
+            "step_p95_us": float(np.percentile(window, 95)),
+        }
+        if frame is not None:
+            frame_stats = measure(frame, 5)
+            frame_samples.append(frame_stats["p50_us"])
+            sample["frame_p50_us"] = frame_stats["p50_us"]
+        series.append(sample)
+
+    results = {"long-run/step": dict(summarize(step_samples), games=games + 1)}
+    if frame_samples:
+        results["long-run/frame"] = summarize(frame_samples)
+    # Late-run cost relative to early-run cost; about 1 when nothing grows with the run
+    quarter = max(1, len(series) // 4)
+    for name, field in (("long-run/step", "step_mean_us"), ("long-run/frame", "frame_p50_us")):
+        if name in results:
+            early = np.mean([s[field] for s in series[:quarter]])
+            late = np.mean([s[field] for s in series[-quarter:]])
+            results[name]["growth"] = float(late / early)
+    return results, series
+
+
+# ==================== Report ====================
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, timeout=10,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def run(args):
+    report = {
+        "schema": SCHEMA,
+        "meta": {
+            "commit": git_commit(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "system": platform.platform(),
+            "repeat": args.repeat,
+        },
+        "results": {},
+        "skipped": {},
+    }
+
+    if "physics" in args.group:
+        print("physics...", file=sys.stderr)
+        report["results"].update(bench_physics(args.repeat))
+
+    game = None
+    if "render" in args.group or "long-run" in args.group:
+        game, context, reason = setup_render(args.gl)
+        if game is None:
+            print(f"render: skipped ({reason})", file=sys.stderr)
+            report["skipped"]["render"] = reason
+        else:
+            report["meta"]["gl_platform"] = context.platform
+            report["meta"]["gl_renderer"] = context.renderer
+
+    if "render" in args.group and game is not None:
+        print("render...", file=sys.stderr)
+        report["results"].update(bench_render(game, args.repeat))
+
+    if "long-run" in args.group:
+        print(f"long run ({args.long_ticks} ticks)...", file=sys.stderr)
+        results, series = bench_long_run(game, args.long_ticks, args.sample_every)
+        report["results"].update(results)
+        report["long_run"] = series
+    return report
+
+
+def compare(old_path, new_path, threshold):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    for key in ("python", "machine", "gl_renderer"):
+        a, b = old["meta"].get(key), new["meta"].get(key)
+        if a != b:
+            print(f"warning: {key} differs ({a} vs {b}), timings may not be comparable")
+
+    regressions = 0
+    names = [name for name in old["results"] if name in new["results"]]
+    width = max([len(name) for name in names] + [9])
+    print(f"{'benchmark':<{width}} {'old p50':>10} {'new p50':>10} {'change':>8}")
+    for name in names:
+        a, b = old["results"][name]["p50_us"], new["results"][name]["p50_us"]
+        change = 100.0 * (b - a) / a if a else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif change < -threshold:
+            flag = "  faster"
+        print(f"{name:<{width}} {a:>8.1f}us {b:>8.1f}us {change:>+7.1f}%{flag}")
+    for name in sorted(old["results"].keys() - new["results"].keys()):
+        print(f"only in {old_path}: {name}")
+    for name in sorted(new["results"].keys() - old["results"].keys()):
+        print(f"only in {new_path}: {name}")
+    print(f"{regressions} regression(s) over {threshold:g}%")
+    return regressions == 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the physics, generation and render hot paths.")
+    parser.add_argument("--group", nargs="+", choices=GROUPS, default=list(GROUPS))
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="timing samples per benchmark")
+    parser.add_argument("--long-ticks", type=int, default=DEFAULT_LONG_TICKS, help="ticks in the long run")
+    parser.add_argument("--sample-every", type=int, default=DEFAULT_SAMPLE_EVERY,
+                        help="long-run ticks per sample")
+    parser.add_argument("--gl", choices=offscreen.PLATFORMS, default="egl", help="offscreen GL platform")
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"),
+                        help="compare two reports instead of running; exits 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="percent slower (p50) that counts as a regression")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        raise SystemExit(0 if compare(*args.compare, args.threshold) else 1)
+
+    report = run(args)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
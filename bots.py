@@ -0,0 +1,94 @@
+import numpy as np
+from game_state import CHAR_WIDTH, CHAR_HEIGHT, INPUT_LEFT, INPUT_RIGHT, INPUT_JUMP
+
+# ==================== Greedy Bot ====================
+# Always holds jump. Standing, it steers towards the next platform up. In the
+# air it aims for the highest platform the rest of the jump can still reach
+# (the landing platform); once falling onto it, it drifts towards the
+# platform after that, but never past the landing platform's edge, so the
+# next jump starts as close as possible. greedy_bot() drives a GameState,
+# greedy_bot_batch() a BatchSimulator, and both pick the same inputs for the
+# same state.
+
+DEAD_ZONE = 5     # don't steer when this close to the target
+EDGE_MARGIN = 15  # how far past a platform's edge the centre may drift and still land
+LOOK_RANGE = 400  # how far above and below the feet platforms are considered
+
+
+def _steer(x, target):
+    if target < x - DEAD_ZONE:
+        return INPUT_LEFT
+    if target > x + DEAD_ZONE:
+        return INPUT_RIGHT
+    return 0
+
+
+def greedy_bot(state):
+    feet = state.y - CHAR_HEIGHT/2
+    inputs = INPUT_JUMP
+
+    if not state.is_jumping:
+        for p in state.platforms.query(feet + 5, feet + LOOK_RANGE):
+            if p.y + p.height > feet + 5:
+                return inputs | _steer(state.x, p.x + p.width/2)
+        return inputs
+
+    v = state.y_velocity
+    apex = feet + (v*v/(-2*state.gravity) if v > 0 else 0)
+    land = after = None
+    for p in state.platforms.query(feet - LOOK_RANGE, apex + LOOK_RANGE):
+        if p.y + p.height <= apex - 5:
+            land = p
+        elif after is None:
+            after = p
+    if land is None:
+        return inputs
+
+    over = state.x - CHAR_WIDTH/2 < land.x + land.width and state.x + CHAR_WIDTH/2 > land.x
+    if v < 0 and over and after is not None:
+        target = min(max(after.x + after.width/2, land.x - EDGE_MARGIN), land.x + land.width + EDGE_MARGIN)
+    else:
+        target = land.x + land.width/2
+    return inputs | _steer(state.x, target)
+
+
+def greedy_bot_batch(sim):
+    rows = np.arange(sim.n)
+    feet = sim.y - CHAR_HEIGHT/2
+    v = sim.y_velocity
+    top = sim.plat_y + sim.plat_h
+    centre = sim.plat_x + sim.plat_w/2
+    last = top.shape[1] - 1
+
+    # Standing: lowest platform above the feet (rows are sorted by y)
+    up = ((top >= feet[:, None] + 5) & (sim.plat_y <= feet[:, None] + LOOK_RANGE) &
+          (top > feet[:, None] + 5))
+    has_up = up.any(axis=1)
+    up_centre = centre[rows, up.argmax(axis=1)]
+
+    # Airborne: highest platform under the apex, and the first one after it
+    apex = feet + np.where(v > 0, v*v/(-2*sim.gravity), 0)
+    near = (top >= feet[:, None] - LOOK_RANGE) & (sim.plat_y <= apex[:, None] + LOOK_RANGE)
+    reachable = near & (top <= apex[:, None] - 5)
+    has_land = reachable.any(axis=1)
+    land = last - reachable[:, ::-1].argmax(axis=1)
+    land_x = sim.plat_x[rows, land]
+    land_w = sim.plat_w[rows, land]
+    beyond = near & ~reachable
+    has_after = beyond.any(axis=1)
+    after_centre = centre[rows, beyond.argmax(axis=1)]
+
+    over = (sim.x - CHAR_WIDTH/2 < land_x + land_w) & (sim.x + CHAR_WIDTH/2 > land_x)
+    standing = ~sim.is_jumping & has_up
+    airborne = sim.is_jumping & has_land
+    drift = airborne & (v < 0) & over & has_after
+
+    target = np.full(sim.n, np.nan)
+    target[standing] = up_centre[standing]
+    target[airborne] = (land_x + land_w/2)[airborne]
+    target[drift] = np.minimum(np.maximum(after_centre, land_x - EDGE_MARGIN), land_x + land_w + EDGE_MARGIN)[drift]
+
+    inputs = np.full(sim.n, INPUT_JUMP, dtype=np.int64)
+    inputs[target < sim.x - DEAD_ZONE] |= INPUT_LEFT
+    inputs[target > sim.x + DEAD_ZONE] |= INPUT_RIGHT
+    return inputs
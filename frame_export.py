@@ -0,0 +1,263 @@
+import argparse
+import ctypes
+import os
+import struct
+import subprocess
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import offscreen
+from game_state import GameState, TICK_RATE, WINDOW_WIDTH, WINDOW_HEIGHT, EVENT_GAME_OVER
+
+# ==================== Frame Export ====================
+# Renders a replay, or the bot playing a seed ("attract mode"), without a
+# window: on an offscreen context (see offscreen.py) into a framebuffer
+# object of any size, as fast as the GPU allows. Frames are read back through
+# a ring of pixel buffer objects: glReadPixels into a PBO returns at once and
+# the copy is mapped a few frames later, when the GPU is long done with it, so
+# reading back never waits on the frame just drawn. Frames go to ffmpeg
+# through a pipe, or to numbered PNGs written on worker threads.
+#
+#   python frame_export.py --replay run.icyr --out run.mp4
+#   python frame_export.py --attract --seed 7 --seconds 30 --width 1200 --height 1600 --out attract.mp4
+#   python frame_export.py --replay run.icyr --frames frames/
+#
+# Everything that imports OpenGL is imported after the context exists.
+
+READBACK_DEPTH = 3     # PBOs in the ring; frames are handed out this many reads late
+TAIL_SECONDS = 2       # keep rendering the game over screen this long after a run ends
+ATTRACT_SECONDS = 60   # longest attract run without --seconds; the bot can get stuck
+FFMPEG = "ffmpeg"
+PNG_WORKERS = min(8, os.cpu_count() or 1)
+PNG_LEVEL = 1          # zlib level; higher levels are several times slower for ~15% smaller files
+
+
+# ==================== Readback ====================
+class ReadbackRing:
+    def __init__(self, width, height, depth=READBACK_DEPTH):
+        from OpenGL.GL import glGenBuffers, glBindBuffer, glBufferData, GL_PIXEL_PACK_BUFFER, GL_STREAM_READ
+        self.width = width
+        self.height = height
+        self.depth = depth
+        self.frame_size = width*height*4
+        self.buffers = [int(b) for b in glGenBuffers(depth)] if depth > 1 else [int(glGenBuffers(1))]
+        for buffer in self.buffers:
+            glBindBuffer(GL_PIXEL_PACK_BUFFER, buffer)
+            glBufferData(GL_PIXEL_PACK_BUFFER, self.frame_size, None, GL_STREAM_READ)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        self._issued = 0
+        self._collected = 0
+
+    def read(self):
+        # Queues a copy of the bound framebuffer. Returns the oldest queued
+        # frame (RGBA rows, bottom row first) once the ring is full, else None.
+        from OpenGL.GL import glBindBuffer, GL_PIXEL_PACK_BUFFER, GL_RGBA, GL_UNSIGNED_BYTE
+        from OpenGL.raw.GL.VERSION.GL_1_0 import glReadPixels
+        frame = None
+        if self._issued - self._collected == self.depth:
+            frame = self._collect()
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, self.buffers[self._issued % self.depth])
+        glReadPixels(0, 0, self.width, self.height, GL_RGBA, GL_UNSIGNED_BYTE, ctypes.c_void_p(0))
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        self._issued += 1
+        return frame
+
+    def drain(self):
+        # The frames still queued, oldest first
+        while self._collected < self._issued:
+            yield self._collect()
+
+    def _collect(self):
+        from OpenGL.GL import glBindBuffer, glMapBuffer, glUnmapBuffer, GL_PIXEL_PACK_BUFFER, GL_READ_ONLY
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, self.buffers[self._collected % self.depth])
+        address = glMapBuffer(GL_PIXEL_PACK_BUFFER, GL_READ_ONLY)
+        frame = ctypes.string_at(address, self.frame_size)
+        glUnmapBuffer(GL_PIXEL_PACK_BUFFER)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        self._collected += 1
+        return frame
+
+    def delete(self):
+        from OpenGL.GL import glDeleteBuffers
+        glDeleteBuffers(len(self.buffers), self.buffers)
+        self.buffers = []
+
+
+# ==================== Writers ====================
+class VideoWriter:
+    # Raw frames piped into ffmpeg, which flips and encodes them in its own process
+    def __init__(self, path, width, height, fps, ffmpeg=FFMPEG):
+        if width % 2 or height % 2:
+            raise ValueError(f"video size must be even, got {width}x{height}")
+        command = [ffmpeg, "-y", "-loglevel", "error",
+                   "-f", "rawvideo", "-pix_fmt", "rgba", "-s", f"{width}x{height}", "-r", str(fps), "-i", "-",
+                   "-vf", "vflip", "-pix_fmt", "yuv420p", path]
+        try:
+            self._process = subprocess.Popen(command, stdin=subprocess.PIPE)
+        except FileNotFoundError:
+            raise RuntimeError(f"{ffmpeg} not found; install ffmpeg or export PNGs with --frames DIR") from None
+        self.frames = 0
+
+    def write(self, frame):
+        self._process.stdin.write(frame)
+        self.frames += 1
+
+    def close(self):
+        self._process.stdin.close()
+        if self._process.wait():
+            raise RuntimeError(f"ffmpeg exited with status {self._process.returncode}")
+
+
+def write_png(path, frame, width, height, level=PNG_LEVEL):
+    # A bottom-row-first RGBA frame as a PNG. zlib releases the GIL while it
+    # compresses, so several of these run in parallel on threads, which
+    # pygame.image.save() does not.
+    rows = np.frombuffer(frame, np.uint8).reshape(height, width*4)
+    scanlines = np.zeros((height, width*4 + 1), np.uint8)  # leading 0: no row filter
+    scanlines[:, 1:] = rows[::-1]
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)))
+        f.write(chunk(b"IDAT", zlib.compress(scanlines.tobytes(), level)))
+        f.write(chunk(b"IEND", b""))
+
+
+class ImageSequenceWriter:
+    # frame_000000.png, frame_000001.png, ... encoded on worker threads, with
+    # at most two frames per worker waiting so memory stays bounded
+    def __init__(self, directory, width, height, workers=PNG_WORKERS):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.width = width
+        self.height = height
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="png-writer")
+        self._pending = deque()
+        self._limit = workers*2
+        self.frames = 0
+
+    def write(self, frame):
+        while len(self._pending) >= self._limit:
+            self._pending.popleft().result()
+        path = os.path.join(self.directory, f"frame_{self.frames:06d}.png")
+        self._pending.append(self._pool.submit(write_png, path, frame, self.width, self.height))
+        self.frames += 1
+
+    def close(self):
+        while self._pending:
+            self._pending.popleft().result()
+        self._pool.shutdown()
+
+
+# ==================== Export ====================
+def export(game, state, next_inputs, writer, width, height, fps, last_tick=None, depth=READBACK_DEPTH):
+    # Renders `state` as driven by next_inputs(state) into `writer`, one frame
+    # per 1/fps s of game time, until the game is over (plus TAIL_SECONDS) or
+    # last_tick is reached. `game` is the FinalProject module, set up on the
+    # current context. Returns the number of frames written.
+    from OpenGL.GL import glFlush
+    from render_target import RenderTarget
+
+    game.band_cache.set_scale(max(width / WINDOW_WIDTH, height / WINDOW_HEIGHT))
+    game.state = state
+    target = RenderTarget(width, height)
+    ring = ReadbackRing(width, height, depth)
+    end_tick = last_tick
+
+    frame_index = 0
+    while end_tick is None or state.tick < end_tick:
+        tick = frame_index*TICK_RATE // fps
+        while state.tick < tick:
+            state.step(next_inputs(state))
+            game.update_particles(state.events)
+            if state.fall_detected and EVENT_GAME_OVER in state.events:
+                over = state.tick + round(TAIL_SECONDS*TICK_RATE)
+                end_tick = over if end_tick is None else min(end_tick, over)
+        game.update_game_textures()
+
+        target.begin(0, 0, WINDOW_WIDTH, WINDOW_HEIGHT)
+        game.draw_frame(state.x, state.y, state.camera_y)
+        frame = ring.read()
+        target.end()
+        glFlush()
+        if frame is not None:
+            writer.write(frame)
+        frame_index += 1
+
+    for frame in ring.drain():
+        writer.write(frame)
+    ring.delete()
+    target.delete()
+    return frame_index
+
+
+# ==================== Command Line ====================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render a replay or attract-mode run to a video or PNG frames, headless.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--replay", metavar="FILE", help="recorded run to render")
+    source.add_argument("--attract", action="store_true", help="let the bot play --seed")
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument("--out", metavar="FILE", help="video file, encoded by ffmpeg (e.g. run.mp4)")
+    output.add_argument("--frames", metavar="DIR", help="write numbered PNG frames to DIR")
+    parser.add_argument("--seed", type=int, default=0, help="with --attract, the tower to play (default: 0)")
+    parser.add_argument("--seconds", type=float,
+                        help=f"stop after this much game time (attract mode: at most {ATTRACT_SECONDS} s by default)")
+    parser.add_argument("--width", type=int, default=WINDOW_WIDTH)
+    parser.add_argument("--height", type=int, default=WINDOW_HEIGHT)
+    parser.add_argument("--fps", type=int, default=TICK_RATE, help=f"frames per second of game time (default: {TICK_RATE})")
+    parser.add_argument("--gl", choices=offscreen.PLATFORMS, default="egl", help="offscreen GL platform")
+    parser.add_argument("--ffmpeg", default=FFMPEG, help="ffmpeg executable")
+    args = parser.parse_args(argv)
+
+    if args.replay:
+        from replay import load_replay
+        replay = load_replay(args.replay)
+        state = GameState(seed=replay.seed)
+        next_inputs = lambda state: replay.inputs[state.tick] if state.tick < len(replay.inputs) else 0
+        last_tick = len(replay.inputs) + round(TAIL_SECONDS*TICK_RATE)
+    else:
+        from bots import greedy_bot
+        state = GameState(seed=args.seed)
+        next_inputs = greedy_bot
+        last_tick = round(ATTRACT_SECONDS*TICK_RATE)
+    if args.seconds is not None:
+        limit = round(args.seconds*TICK_RATE)
+        last_tick = limit if last_tick is None else min(last_tick, limit)
+
+    # The window-sized surface is never drawn to; frames go to a framebuffer object
+    context = offscreen.create_context(16, 16, args.gl)
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    import FinalProject as game
+    from assets import asset_path
+    game.init_gl()
+    game.load_textures(asset_path("Images"))
+    game.init_text()
+
+    if args.out:
+        writer = VideoWriter(args.out, args.width, args.height, args.fps, args.ffmpeg)
+    else:
+        writer = ImageSequenceWriter(args.frames, args.width, args.height)
+    start = time.perf_counter()
+    try:
+        frames = export(game, state, next_inputs, writer, args.width, args.height, args.fps, last_tick)
+    finally:
+        writer.close()
+    elapsed = time.perf_counter() - start
+    context.release()
+
+    length = frames / args.fps
+    print(f"{frames} frames ({length:.1f} s at {args.width}x{args.height}, score {state.score}) "
+          f"to {args.out or args.frames} in {elapsed:.1f} s: {frames / elapsed:.0f} fps, "
+          f"{length / elapsed:.1f}x real time")
+
+
+if __name__ == "__main__":
+    main()
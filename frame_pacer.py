@@ -0,0 +1,97 @@
+import time
+import numpy as np
+
+# ==================== Frame Pacer ====================
+# Ends each frame on a fixed deadline instead of sleeping "1/60 minus
+# something". Deadlines advance by exactly one period, so a slow frame is made
+# up by a shorter wait on the next one rather than shifting every later frame.
+# The wait sleeps until SPIN_TIME before the deadline and busy-waits the rest,
+# because sleep() can overshoot by a millisecond or more. Given a poll
+# function, the sleep is cut into POLL_INTERVAL slices with a poll after each,
+# so input events are picked up (and timestamped) while the frame waits.
+#
+#   fps=None         uncapped: no waiting at all (benchmarking)
+#   vsync=True       swap_buffers() blocks until the display refreshes; a cap
+#                    below the refresh rate still waits on top of it
+#
+# A frame is late (a missed deadline) when it ends more than half a period
+# after its deadline; the deadline then restarts from now instead of racing to
+# catch up. Frame-to-frame intervals are kept for jitter statistics.
+
+SPIN_TIME = 0.002          # seconds before a deadline to stop sleeping and spin
+POLL_INTERVAL = 0.001
+LATE_TOLERANCE = 0.5       # fraction of a period a frame may end late
+DEFAULT_HISTORY = 600
+
+
+class FramePacer:
+    def __init__(self, fps=60, vsync=False, refresh_rate=None, history=DEFAULT_HISTORY):
+        self.fps = fps
+        self.vsync = vsync
+        # With vsync and no cap the display sets the pace; lateness is judged
+        # against its refresh rate
+        rate = fps or (refresh_rate if vsync else None)
+        self.period = 1.0 / rate if rate else None
+        self.history = history
+        self.intervals = np.zeros(history)  # seconds between frame ends
+        self.frames = 0
+        self.missed = 0
+        self._deadline = None
+        self._last = None
+
+    def wait(self, poll=None):
+        # Call once per frame, after swap_buffers()
+        now = time.perf_counter()
+        if self.fps:
+            if self._deadline is None:
+                self._deadline = now
+            self._deadline += self.period
+            sleep_until = self._deadline - SPIN_TIME
+            if poll is None:
+                if sleep_until > now:
+                    time.sleep(sleep_until - now)
+            else:
+                while (left := sleep_until - time.perf_counter()) > 0:
+                    time.sleep(min(left, POLL_INTERVAL))
+                    poll()
+            while time.perf_counter() < self._deadline:
+                pass
+            now = time.perf_counter()
+            if now - self._deadline > self.period * LATE_TOLERANCE:
+                self.missed += 1
+                self._deadline = now
+        elif self.period is not None and self._last is not None:
+            if now - self._last > self.period * (1 + LATE_TOLERANCE):
+                self.missed += 1
+
+        if self._last is not None:
+            self.intervals[self.frames % self.history] = now - self._last
+            self.frames += 1
+        self._last = now
+
+    # ==================== Statistics ====================
+    def recent(self):
+        return self.intervals[:min(self.frames, self.history)]
+
+    def stats(self):
+        # Over the last `history` frames, times in milliseconds. Jitter is the
+        # standard deviation of the frame-to-frame interval.
+        ms = self.recent() * 1000
+        if not len(ms):
+            return {"fps": 0.0, "mean_ms": 0.0, "jitter_ms": 0.0, "p99_ms": 0.0, "missed": self.missed}
+        mean = ms.mean()
+        return {
+            "fps": 1000 / mean if mean else 0.0,
+            "mean_ms": mean,
+            "jitter_ms": ms.std(),
+            "p99_ms": np.percentile(ms, 99),
+            "missed": self.missed,
+        }
+
+    def summary(self):
+        s = self.stats()
+        mode = f"{self.fps} fps cap" if self.fps else "uncapped"
+        if self.vsync:
+            mode += ", vsync"
+        return (f"frame pacing ({mode}): {s['fps']:.1f} fps, mean {s['mean_ms']:.2f} ms, "
+                f"jitter {s['jitter_ms']:.2f} ms, p99 {s['p99_ms']:.2f} ms, missed {s['missed']}")
@@ -0,0 +1,383 @@
+import collections
+import random
+import time
+from platform_store import PlatformStore
+
+# ==================== Headless Game State ====================
+# Everything the simulation needs, with no window, GL context or audio. One
+# call to GameState.step() advances the game by one fixed tick; FinalProject.py
+# feeds it keyboard input and draws the result, tools and bots drive it
+# directly.
+
+# ==================== World Settings ====================
+TICK_RATE = 60  # simulation ticks per second; every speed below is per tick
+
+WINDOW_WIDTH = 600
+WINDOW_HEIGHT = 800
+WALL_WIDTH = 75
+
+CHAR_WIDTH = 50
+CHAR_HEIGHT = 50
+
+GROUND_Y = 0
+GROUND_HEIGHT = 50
+PLATFORM_HEIGHT = 40
+PLATFORM_PRUNE_MARGIN = 100  # keep platforms this far below the camera (matches draw culling)
+
+CAMERA_THRESHOLD = WINDOW_HEIGHT * 0.6  # camera follows once the player is above this
+
+# ==================== Default Difficulty ====================
+SPEED = 3
+JUMP_SPEED = 15
+GRAVITY = -0.6
+CAMERA_SPEED_BASE = 1.5
+CAMERA_SPEED_STEP = 0.5        # added every JUMPS_PER_SPEEDUP successful jumps
+JUMPS_PER_SPEEDUP = 10
+PLATFORM_WIDTH_RANGE = (100, 150)
+PLATFORM_GAP_RANGE = (80, 150)
+FIRST_GAP_RANGE = (100, 150)   # gap between the ground and the first platform
+BOUNCE_SPEED = 8
+BOUNCE_TICKS = 10
+
+# ==================== Inputs ====================
+# step() takes a bitmask of the keys held during the tick
+INPUT_LEFT = 1
+INPUT_RIGHT = 2
+INPUT_JUMP = 4
+
+# ==================== Events ====================
+# Names collected in GameState.events during a step, for sound and effects
+EVENT_START = "start"
+EVENT_JUMP = "jump"
+EVENT_LAND = "land"
+EVENT_WALL_BOUNCE = "wall_bounce"
+EVENT_GAME_OVER = "game_over"
+
+
+# ==================== Jump Envelope ====================
+# Whether a character standing on one platform can land on another, from the
+# jump arc: a jump sets the velocity to jump_speed, then every tick adds
+# gravity and moves by the velocity. Landing snaps up to 10 px.
+def jump_height(ticks, jump_speed=JUMP_SPEED, gravity=GRAVITY):
+    return ticks*jump_speed + gravity*ticks*(ticks + 1)/2
+
+def max_jump_height(jump_speed=JUMP_SPEED, gravity=GRAVITY):
+    peak = max(0, int(-jump_speed / gravity))
+    return max(jump_height(peak, jump_speed, gravity), jump_height(peak + 1, jump_speed, gravity))
+
+def jump_reach(rise, jump_speed=JUMP_SPEED, gravity=GRAVITY, speed=SPEED):
+    # How far the character's centre can move sideways during a jump that
+    # lands `rise` px above the take-off top, or None if it cannot get that high
+    rise -= 10
+    if rise > max_jump_height(jump_speed, gravity):
+        return None
+    # Last tick of the arc still at or above the target top
+    ticks = int(-jump_speed / gravity)
+    while jump_height(ticks + 1, jump_speed, gravity) >= rise:
+        ticks += 1
+    return speed*ticks
+
+def is_reachable(src_x, src_top, src_width, dst_x, dst_top, dst_width,
+                 jump_speed=JUMP_SPEED, gravity=GRAVITY, speed=SPEED):
+    reach = jump_reach(dst_top - src_top, jump_speed, gravity, speed)
+    if reach is None:
+        return False
+    # Horizontal distance between the ranges of centre x that stand on each platform
+    half = CHAR_WIDTH/2
+    distance = max(0, (dst_x - half) - (src_x + src_width + half), (src_x - half) - (dst_x + dst_width + half))
+    return distance <= reach
+
+
+# ==================== Swept Landing ====================
+# A falling character lands on a platform when its bottom edge passes
+# through the landing band, from 10 px below the platform's top to 20 px above
+# it (landing snaps onto the top), while overlapping the platform sideways.
+# The tick's motion is swept as a straight line from where the character
+# started to where it ended, so no fall speed or tick length can carry it
+# through a platform between two ticks.
+def swept_contact(x0, bottom0, dx, dy, platform_x, platform_top, platform_width):
+    # Earliest fraction of the tick (0..1) at which a character moving from
+    # (x0, bottom0) by (dx, dy), dy < 0, is in the landing band over the
+    # platform, or None if it never is
+    t = max((platform_top + 20 - bottom0) / dy, 0.0)
+    t_exit = min((platform_top - 10 - bottom0) / dy, 1.0)
+    left = platform_x - CHAR_WIDTH/2
+    right = platform_x + platform_width + CHAR_WIDTH/2
+    if dx:
+        t_left = (left - x0) / dx
+        t_right = (right - x0) / dx
+        t = max(t, min(t_left, t_right))
+        if t >= max(t_left, t_right):
+            return None
+    elif not left < x0 < right:
+        return None
+    return t if t <= t_exit else None
+
+
+# ==================== Platform Generation ====================
+# An endless, seeded stream of platforms, each one reachable from the one
+# below it: gaps are capped at the jump height, and x is drawn only from the
+# positions the jump envelope can reach. Platforms are produced in chunks of
+# CHUNK_HEIGHT px of tower; every platform takes the same three draws from
+# the rng whenever it is produced, so the tower for a seed does not depend on
+# when, or in how many pieces, it is generated. GameState and the batch
+# simulator both take their platforms from a PlatformStream.
+CHUNK_HEIGHT = WINDOW_HEIGHT
+PREFETCH_CHUNKS = 4       # chunks kept generated beyond what the camera needs
+PREFETCH_BUDGET = 0.001   # seconds per prefetch() call
+
+class PlatformStream:
+    def __init__(self, rng, width_range=PLATFORM_WIDTH_RANGE, gap_range=PLATFORM_GAP_RANGE,
+                 jump_speed=JUMP_SPEED, gravity=GRAVITY, speed=SPEED):
+        self.rng = rng
+        self.width_range = width_range
+        self.gap_range = gap_range
+        self.jump_speed = jump_speed
+        self.gravity = gravity
+        self.speed = speed
+        self.max_gap = int(max_jump_height(jump_speed, gravity)) + 10
+        self.pending = collections.deque()  # generated (x, y, width), not taken yet
+        self._reach = {}                    # rise -> jump_reach(), rises are whole pixels
+        self.generated_y = GROUND_Y + GROUND_HEIGHT  # top of the generated tower
+        # The platform below the next one, as (x, top, width); the ground at first
+        self._below = (0, GROUND_Y + GROUND_HEIGHT, WINDOW_WIDTH)
+        self._next_y = GROUND_Y + min(rng.randint(*FIRST_GAP_RANGE), self.max_gap)
+
+    def _platform(self):
+        rng = self.rng
+        y = self._next_y
+        width = rng.randint(*self.width_range)
+        src_x, src_top, src_width = self._below
+        rise = y + PLATFORM_HEIGHT - src_top
+        reach = self._reach.get(rise)
+        if reach is None:
+            reach = self._reach[rise] = jump_reach(rise, self.jump_speed, self.gravity, self.speed)
+        lo = max(WALL_WIDTH, int(src_x - width - CHAR_WIDTH - reach))
+        hi = min(WINDOW_WIDTH - WALL_WIDTH - width, int(src_x + src_width + CHAR_WIDTH + reach))
+        x = rng.randint(lo, hi)
+        self._below = (x, y + PLATFORM_HEIGHT, width)
+        self._next_y = y + min(rng.randint(*self.gap_range), self.max_gap)
+        return x, y, width
+
+    def generate_chunk(self):
+        end = self.generated_y + CHUNK_HEIGHT
+        while self._next_y < end:
+            self.pending.append(self._platform())
+        self.generated_y = end
+
+    def prefetch(self, until_y, budget=PREFETCH_BUDGET):
+        # Generates whole chunks until the tower reaches until_y or the time
+        # budget runs out; returns whether it got there
+        deadline = time.perf_counter() + budget
+        while self.generated_y < until_y:
+            if time.perf_counter() >= deadline:
+                return False
+            self.generate_chunk()
+        return True
+
+    def take(self, max_y):
+        # Removes and returns every platform with y < max_y, generating
+        # whatever the prefetch has not covered yet
+        while self.generated_y < max_y:
+            self.generate_chunk()
+        taken = []
+        pending = self.pending
+        while pending and pending[0][1] < max_y:
+            taken.append(pending.popleft())
+        return taken
+
+
+class Platform:
+    __slots__ = ("x", "y", "width", "height", "is_ground")
+
+    def __init__(self, x, y, width, height, is_ground=False):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.is_ground = is_ground
+
+
+class GameState:
+    def __init__(self, seed=None, speed=SPEED, jump_speed=JUMP_SPEED, gravity=GRAVITY,
+                 camera_speed_base=CAMERA_SPEED_BASE, camera_speed_step=CAMERA_SPEED_STEP,
+                 jumps_per_speedup=JUMPS_PER_SPEEDUP, gap_range=PLATFORM_GAP_RANGE,
+                 width_range=PLATFORM_WIDTH_RANGE):
+        self.seed = seed
+        self.rng = random.Random(seed)
+
+        self.speed = speed
+        self.jump_speed = jump_speed
+        self.gravity = gravity
+        self.camera_speed_base = camera_speed_base
+        self.camera_speed_step = camera_speed_step
+        self.jumps_per_speedup = jumps_per_speedup
+        self.gap_range = gap_range
+        self.width_range = width_range
+
+        # Character
+        self.x = WINDOW_WIDTH // 2
+        self.y = GROUND_Y + GROUND_HEIGHT + CHAR_HEIGHT/2
+        self.y_velocity = 0
+        self.is_jumping = False
+        self.flip = False
+        self.moving = False
+
+        # Game
+        self.tick = 0
+        self.game_started = False
+        self.fall_detected = False
+        self.successful_jumps = 0
+        self.camera_speed = camera_speed_base
+        self.camera_y = 0.0
+        self.score = 0
+
+        # Bounce effect
+        self.bounce_effect = False
+        self.bounce_timer = 0
+        self.bounce_direction = 0  # 1 for right, -1 for left
+
+        self.events = []
+
+        self.stream = PlatformStream(self.rng, width_range, gap_range, jump_speed, gravity, speed)
+        self.platforms = PlatformStore()
+        self.platforms.add(Platform(0, GROUND_Y, WINDOW_WIDTH, GROUND_HEIGHT, is_ground=True))
+        self.generate_platforms(WINDOW_HEIGHT*3)
+
+    # ==================== Platform Generation ====================
+    def generate_platforms(self, max_y):
+        for x, y, width in self.stream.take(max_y):
+            self.platforms.add(Platform(x, y, width, PLATFORM_HEIGHT))
+
+    def prefetch(self, budget=PREFETCH_BUDGET):
+        # Generates tower chunks ahead of the camera in spare frame time, so
+        # step() only ever moves finished platforms into the store
+        return self.stream.prefetch(self.camera_y + WINDOW_HEIGHT*2 + PREFETCH_CHUNKS*CHUNK_HEIGHT, budget)
+
+    # ==================== Physics Helpers ====================
+    def is_on_solid_ground(self):
+        if self.y <= GROUND_Y + CHAR_HEIGHT/2:
+            self.y = GROUND_Y + CHAR_HEIGHT/2
+            return True
+        player_bottom = self.y - CHAR_HEIGHT/2
+        for platform in self.platforms.query(player_bottom - 10, player_bottom + 10):
+            platform_top = platform.y + platform.height
+            if (self.x - CHAR_WIDTH/2 < platform.x + platform.width and self.x + CHAR_WIDTH/2 > platform.x and
+                player_bottom >= platform_top - 10 and player_bottom <= platform_top + 10):
+                self.y = platform_top + CHAR_HEIGHT/2
+                return True
+        return False
+
+    def check_platform_collision(self, start_x, start_y):
+        # Lands on the platform the move from (start_x, start_y) this tick
+        # touches first
+        if self.y_velocity >= 0:
+            return False
+        bottom0 = start_y - CHAR_HEIGHT/2
+        dx = self.x - start_x
+        dy = self.y_velocity
+        player_bottom = bottom0 + dy
+        first, first_t = None, None
+        for platform in self.platforms.query(player_bottom - 20, bottom0 + 10):
+            t = swept_contact(start_x, bottom0, dx, dy, platform.x, platform.y + platform.height, platform.width)
+            if t is not None and (first_t is None or t < first_t):
+                first, first_t = platform, t
+        if first is None:
+            return False
+
+        # Land on the platform
+        self.y = first.y + first.height + CHAR_HEIGHT/2
+        self.y_velocity = 0
+
+        if self.is_jumping:
+            self.successful_jumps += 1
+            self.score += 1
+            if self.successful_jumps % self.jumps_per_speedup == 0:
+                self.camera_speed += self.camera_speed_step
+            self.events.append(EVENT_LAND)
+
+        self.is_jumping = False
+        return True
+
+    # ==================== Movement ====================
+    def update_bounce_effect(self):
+        if self.bounce_effect and self.bounce_timer > 0:
+            self.x += self.bounce_direction*BOUNCE_SPEED*(self.bounce_timer/BOUNCE_TICKS)
+            self.bounce_timer -= 1
+            if self.bounce_timer <= 0:
+                self.bounce_effect = False
+                self.bounce_timer = 0
+
+    def update_movement(self, inputs):
+        self.update_bounce_effect()
+        if self.bounce_effect:
+            return True
+        char_half = CHAR_WIDTH/2
+        moving = False
+        if inputs & INPUT_RIGHT:
+            self.x += self.speed
+            self.flip = False
+            moving = True
+            if self.x > WINDOW_WIDTH - WALL_WIDTH - char_half:
+                self.x = WINDOW_WIDTH - WALL_WIDTH - char_half
+                self.start_bounce(-1)
+        if inputs & INPUT_LEFT:
+            self.x -= self.speed
+            self.flip = True
+            moving = True
+            if self.x < WALL_WIDTH + char_half:
+                self.x = WALL_WIDTH + char_half
+                self.start_bounce(1)
+        return moving
+
+    def start_bounce(self, direction):
+        self.bounce_effect = True
+        self.bounce_timer = BOUNCE_TICKS
+        self.bounce_direction = direction
+        self.events.append(EVENT_WALL_BOUNCE)
+
+    # ==================== Tick ====================
+    def step(self, inputs):
+        self.events = []
+        self.tick += 1
+
+        # Start game on first jump press
+        if not self.game_started and inputs & INPUT_JUMP:
+            self.game_started = True
+            self.y = GROUND_Y + GROUND_HEIGHT + CHAR_HEIGHT/2
+            self.y_velocity = 0
+            self.is_jumping = False
+            self.events.append(EVENT_START)
+
+        start_x, start_y = self.x, self.y
+        self.moving = self.update_movement(inputs) if not self.fall_detected else False
+
+        if self.game_started and not self.fall_detected:
+            self.y_velocity += self.gravity
+            self.y += self.y_velocity
+
+            landed = self.check_platform_collision(start_x, start_y)
+            if not landed and self.y <= GROUND_Y + CHAR_HEIGHT/2:
+                self.y = GROUND_Y + CHAR_HEIGHT/2
+                self.y_velocity = 0
+                self.is_jumping = False
+
+            if inputs & INPUT_JUMP and not self.is_jumping and self.is_on_solid_ground():
+                self.y_velocity = self.jump_speed
+                self.is_jumping = True
+                self.events.append(EVENT_JUMP)
+
+            self.camera_y += self.camera_speed
+            if self.y > self.camera_y + CAMERA_THRESHOLD:
+                self.camera_y = self.y - CAMERA_THRESHOLD
+
+            if self.y + CHAR_HEIGHT/2 < self.camera_y:
+                self.fall_detected = True
+                self.events.append(EVENT_GAME_OVER)
+
+        # Keep platforms generated ahead of the camera and drop the ones behind it
+        top_needed = self.camera_y + WINDOW_HEIGHT*2
+        if self.platforms.top_y() < top_needed:
+            self.generate_platforms(top_needed)
+        self.platforms.prune_below(self.camera_y - PLATFORM_PRUNE_MARGIN)
+        return self.events
@@ -0,0 +1,97 @@
+import time
+from collections import deque
+import numpy as np
+import glfw
+from game_state import INPUT_LEFT, INPUT_RIGHT, INPUT_JUMP, EVENT_JUMP
+
+# ==================== Input Queue ====================
+# Key presses and releases arrive through GLFW's key callback, stamped with
+# the time they were delivered, instead of being sampled once a frame. The
+# main loop knows the real time each simulation tick stands for and asks for
+# the inputs of a tick with inputs_until(tick_time): every event up to then
+# is applied, in order, so a key goes down on the tick it was pressed, and a
+# tap of any key shorter than a tick still counts for the tick it fell in.
+#
+# GLFW only delivers events while polling, so stamps are as fine as the
+# polling; the frame pacer polls every millisecond while it waits.
+#
+# Jump is edge triggered as well as held: a press is remembered for
+# JUMP_BUFFER_TICKS ticks, so a tap just before landing still jumps.
+#
+# Latency is measured from a press's stamp to the return of the first
+# swap_buffers() showing its effect (input to present; the display's own
+# scan-out comes on top).
+
+KEY_INPUTS = {
+    glfw.KEY_LEFT: INPUT_LEFT,
+    glfw.KEY_RIGHT: INPUT_RIGHT,
+    glfw.KEY_SPACE: INPUT_JUMP,
+}
+JUMP_BUFFER_TICKS = 6
+LATENCY_HISTORY = 120
+
+
+class InputQueue:
+    def __init__(self):
+        self.events = deque()  # (time, input bit, pressed), oldest first
+        self.held = 0
+        self.jump_buffer = 0   # ticks left in which a jump press still counts
+        self.latency_ms = np.zeros(LATENCY_HISTORY)
+        self.presses = 0       # presses measured so far
+        self._unpresented = []
+
+    def attach(self, window):
+        glfw.set_key_callback(window, self.on_key)
+
+    def on_key(self, window, key, scancode, action, mods):
+        bit = KEY_INPUTS.get(key)
+        if bit is None or action == glfw.REPEAT:
+            return
+        self.events.append((time.perf_counter(), bit, action == glfw.PRESS))
+
+    def inputs_until(self, tick_time):
+        # The input bitmask for the tick ending at real time tick_time. A key
+        # pressed during the tick counts for it even if it was released again
+        # before the tick ended.
+        pressed_this_tick = 0
+        while self.events and self.events[0][0] <= tick_time:
+            stamp, bit, pressed = self.events.popleft()
+            if pressed:
+                self.held |= bit
+                pressed_this_tick |= bit
+                if bit == INPUT_JUMP:
+                    self.jump_buffer = JUMP_BUFFER_TICKS
+                self._unpresented.append(stamp)
+            else:
+                self.held &= ~bit
+        inputs = self.held | pressed_this_tick
+        if self.jump_buffer > 0:
+            inputs |= INPUT_JUMP
+            self.jump_buffer -= 1
+        return inputs
+
+    def stepped(self, events):
+        # A buffered jump is used up once the character jumps
+        if EVENT_JUMP in events:
+            self.jump_buffer = 0
+
+    def presented(self, now=None):
+        # Call right after swap_buffers()
+        if not self._unpresented:
+            return
+        now = time.perf_counter() if now is None else now
+        for stamp in self._unpresented:
+            self.latency_ms[self.presses % LATENCY_HISTORY] = (now - stamp) * 1000
+            self.presses += 1
+        self._unpresented.clear()
+
+    def latency(self):
+        # (mean, p95) input-to-present latency in ms over the recent presses
+        recent = self.latency_ms[:min(self.presses, LATENCY_HISTORY)]
+        if not len(recent):
+            return 0.0, 0.0
+        return recent.mean(), np.percentile(recent, 95)
+
+    def summary(self):
+        mean, p95 = self.latency()
+        return f"input latency (press to present): mean {mean:.1f} ms, p95 {p95:.1f} ms over {min(self.presses, LATENCY_HISTORY)} presses"
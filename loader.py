@@ -0,0 +1,58 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# ==================== Asset Loader ====================
+# Runs decode jobs (image files, sounds, fonts) on a thread pool while the
+# main thread keeps the window alive. Each job can have an on_done callback;
+# callbacks run on the thread that calls poll(), which is the one owning the
+# GL context, so they can upload textures. A callback may submit follow-up
+# jobs (e.g. packing once every image is decoded).
+#
+# A job that raises re-raises its exception from poll().
+
+DEFAULT_WORKERS = min(8, os.cpu_count() or 1)
+
+
+class AssetLoader:
+    def __init__(self, workers=DEFAULT_WORKERS):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="asset-loader")
+        self._pending = {}  # future -> on_done
+        self.total = 0
+        self.finished = 0
+
+    @property
+    def done(self):
+        return not self._pending
+
+    @property
+    def progress(self):
+        # Fraction of jobs finished so far; jobs submitted later add to the total
+        return self.finished / self.total if self.total else 1.0
+
+    def submit(self, fn, *args, on_done=None):
+        future = self._pool.submit(fn, *args)
+        self._pending[future] = on_done
+        self.total += 1
+        return future
+
+    def poll(self, timeout=0):
+        # Runs the callbacks of finished jobs, waiting up to `timeout` seconds
+        # for the first one
+        if not self._pending:
+            return
+        finished, _ = wait(list(self._pending), timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in finished:
+            on_done = self._pending.pop(future)
+            result = future.result()
+            self.finished += 1
+            if on_done is not None:
+                on_done(result)
+
+    def run(self):
+        # Blocks until every job, including follow-ups, has finished
+        while self._pending:
+            self.poll(timeout=None)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pending.clear()
@@ -0,0 +1,116 @@
+import ctypes
+import os
+import sys
+
+# ==================== Offscreen GL Context ====================
+# A GL context with no window or GPU, for benchmarks and headless rendering.
+# "egl" uses EGL without a display server (Mesa's surfaceless platform, which
+# falls back to the llvmpipe software rasterizer); "osmesa" renders into a
+# plain memory buffer. "glfw" opens a hidden window instead, for desktops
+# whose drivers have no EGL; it needs a display. PyOpenGL binds to one
+# platform the first time OpenGL is imported, so create_context() has to run
+# before anything imports OpenGL.GL (FinalProject.py included).
+
+PLATFORMS = ("egl", "osmesa", "glfw")
+
+
+class OffscreenContext:
+    def __init__(self, platform, width, height):
+        self.platform = platform
+        self.width = width
+        self.height = height
+        self._handles = None
+
+    @property
+    def renderer(self):
+        from OpenGL.GL import glGetString, GL_RENDERER
+        return glGetString(GL_RENDERER).decode()
+
+    def release(self):
+        if self._handles is None:
+            return
+        if self.platform == "egl":
+            from OpenGL import EGL
+            display, surface, context = self._handles
+            EGL.eglMakeCurrent(display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, EGL.EGL_NO_CONTEXT)
+            EGL.eglDestroySurface(display, surface)
+            EGL.eglDestroyContext(display, context)
+            EGL.eglTerminate(display)
+        elif self.platform == "glfw":
+            import glfw
+            glfw.destroy_window(self._handles)
+            glfw.terminate()
+        else:
+            from OpenGL import osmesa
+            osmesa.OSMesaDestroyContext(self._handles[0])
+        self._handles = None
+
+
+def create_context(width, height, platform="egl"):
+    if platform not in PLATFORMS:
+        raise ValueError(f"unknown offscreen platform {platform!r}, expected one of {PLATFORMS}")
+    context = OffscreenContext(platform, width, height)
+    if platform == "glfw":
+        # The window system's own GL, whatever PyOpenGL picked
+        context._handles = _create_glfw(width, height)
+        return context
+
+    if "OpenGL.GL" in sys.modules and os.environ.get("PYOPENGL_PLATFORM") != platform:
+        raise RuntimeError("OpenGL was imported before the offscreen context was created")
+    os.environ["PYOPENGL_PLATFORM"] = platform
+    if platform == "egl":
+        os.environ.setdefault("EGL_PLATFORM", "surfaceless")
+        context._handles = _create_egl(width, height)
+    else:
+        context._handles = _create_osmesa(width, height)
+    return context
+
+
+def _create_egl(width, height):
+    from OpenGL import EGL
+    display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+    if not EGL.eglInitialize(display, None, None):
+        raise RuntimeError("eglInitialize failed")
+
+    attribs = (EGL.EGLint * 13)(
+        EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT,
+        EGL.EGL_RED_SIZE, 8, EGL.EGL_GREEN_SIZE, 8, EGL.EGL_BLUE_SIZE, 8, EGL.EGL_ALPHA_SIZE, 8,
+        EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT,
+        EGL.EGL_NONE)
+    config = EGL.EGLConfig()
+    count = EGL.EGLint()
+    if not EGL.eglChooseConfig(display, attribs, ctypes.pointer(config), 1, ctypes.pointer(count)) or not count.value:
+        raise RuntimeError("no EGL config with desktop OpenGL and a pbuffer surface")
+
+    surface = EGL.eglCreatePbufferSurface(
+        display, config, (EGL.EGLint * 5)(EGL.EGL_WIDTH, width, EGL.EGL_HEIGHT, height, EGL.EGL_NONE))
+    EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+    context = EGL.eglCreateContext(display, config, EGL.EGL_NO_CONTEXT, None)
+    if not EGL.eglMakeCurrent(display, surface, surface, context):
+        raise RuntimeError("eglMakeCurrent failed")
+    return display, surface, context
+
+
+def _create_osmesa(width, height):
+    from OpenGL import osmesa
+    from OpenGL.GL import GL_UNSIGNED_BYTE
+    context = osmesa.OSMesaCreateContextExt(osmesa.OSMESA_RGBA, 24, 0, 0, None)
+    if not context:
+        raise RuntimeError("OSMesaCreateContextExt failed")
+    buffer = (ctypes.c_ubyte * (width * height * 4))()
+    if not osmesa.OSMesaMakeCurrent(context, buffer, GL_UNSIGNED_BYTE, width, height):
+        raise RuntimeError("OSMesaMakeCurrent failed")
+    return context, buffer  # the buffer must outlive the context
+
+
+def _create_glfw(width, height):
+    import glfw
+    if not glfw.init():
+        raise RuntimeError("glfw.init failed (no display?)")
+    glfw.window_hint(glfw.VISIBLE, glfw.FALSE)
+    window = glfw.create_window(width, height, "Icy Tower (offscreen)", None, None)
+    if not window:
+        glfw.terminate()
+        raise RuntimeError("could not create a hidden GLFW window")
+    glfw.make_context_current(window)
+    return window
@@ -0,0 +1,119 @@
+import ctypes
+import numpy as np
+from OpenGL.GL import *
+
+# ==================== Particles ====================
+# Landing dust, combo sparkles and wall-bounce trails. Every particle lives in
+# preallocated NumPy arrays (position, velocity, life, colour), packed at the
+# front: update() moves, slows and ages all of them with a handful of array
+# operations per tick and compacts out the dead ones, and draw() copies the
+# live ones into one vertex buffer and draws them as points with a single
+# glDrawArrays(GL_POINTS) call. Cost does not depend on how big a burst is
+# beyond that copy, and nothing is allocated per particle.
+#
+# Emitting into a full system drops the new particles that do not fit.
+# Particles are cosmetic: they have their own random generator and never
+# touch GameState, so replays and the batch simulator are unaffected.
+
+MAX_PARTICLES = 4096
+GRAVITY = -0.15       # per tick, like the character's, but lighter
+DRAG = 0.96           # velocity kept per tick
+POINT_SIZE = 4        # pixels at scale 1
+
+FLOATS_PER_VERTEX = 6  # x, y, r, g, b, a
+VERTEX_STRIDE = FLOATS_PER_VERTEX * 4
+
+
+class ParticleSystem:
+    def __init__(self, capacity=MAX_PARTICLES, seed=None):
+        self.capacity = capacity
+        self.count = 0
+        self.position = np.zeros((capacity, 2), np.float32)
+        self.velocity = np.zeros((capacity, 2), np.float32)
+        self.life = np.zeros(capacity, np.float32)      # ticks left
+        self.max_life = np.ones(capacity, np.float32)
+        self.color = np.zeros((capacity, 4), np.float32)
+        self.gravity = np.zeros(capacity, np.float32)   # fraction of GRAVITY each one feels
+        self._vertices = np.zeros((capacity, FLOATS_PER_VERTEX), np.float32)
+        self._rng = np.random.default_rng(seed)
+        self._vbo = None
+        self.dropped = 0  # particles that did not fit
+
+    def emit(self, x, y, count, speed, angle=0.0, spread=np.pi*2, life=30, color=(1.0, 1.0, 1.0, 1.0),
+             gravity=1.0, jitter=0.0):
+        # count particles from (x, y), heading `angle` (radians, 0 = right)
+        # give or take spread/2, at 0.5..1 times speed, living 0.5..1 times
+        # life ticks; jitter scatters the start position by up to that many
+        # pixels
+        n = min(count, self.capacity - self.count)
+        self.dropped += count - n
+        if n <= 0:
+            return
+        s = slice(self.count, self.count + n)
+        rng = self._rng
+        heading = angle + (rng.random(n) - 0.5)*spread
+        magnitude = speed*(0.5 + 0.5*rng.random(n))
+        self.position[s, 0] = x
+        self.position[s, 1] = y
+        if jitter:
+            self.position[s] += (rng.random((n, 2)) - 0.5)*(2*jitter)
+        self.velocity[s, 0] = np.cos(heading)*magnitude
+        self.velocity[s, 1] = np.sin(heading)*magnitude
+        self.life[s] = self.max_life[s] = life*(0.5 + 0.5*rng.random(n))
+        self.color[s] = color
+        self.gravity[s] = gravity
+        self.count += n
+
+    def update(self):
+        # One simulation tick
+        n = self.count
+        if not n:
+            return
+        velocity = self.velocity[:n]
+        velocity[:, 1] += GRAVITY*self.gravity[:n]
+        velocity *= DRAG
+        self.position[:n] += velocity
+        self.life[:n] -= 1
+
+        alive = self.life[:n] > 0
+        live = int(np.count_nonzero(alive))
+        if live < n:
+            for array in (self.position, self.velocity, self.life, self.max_life, self.color, self.gravity):
+                array[:live] = array[:n][alive]
+            self.count = live
+
+    def clear(self):
+        self.count = 0
+
+    def draw(self, point_size=POINT_SIZE):
+        # All live particles in one draw call, fading out over their life
+        n = self.count
+        if not n:
+            return
+        vertices = self._vertices[:n]
+        vertices[:, 0:2] = self.position[:n]
+        vertices[:, 2:6] = self.color[:n]
+        vertices[:, 5] *= self.life[:n] / self.max_life[:n]
+
+        if self._vbo is None:
+            self._vbo = glGenBuffers(1)
+            glBindBuffer(GL_ARRAY_BUFFER, self._vbo)
+            glBufferData(GL_ARRAY_BUFFER, self._vertices.nbytes, None, GL_STREAM_DRAW)
+        else:
+            glBindBuffer(GL_ARRAY_BUFFER, self._vbo)
+        glBufferSubData(GL_ARRAY_BUFFER, 0, vertices.nbytes, vertices)
+
+        glPointSize(point_size)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_COLOR_ARRAY)
+        glVertexPointer(2, GL_FLOAT, VERTEX_STRIDE, ctypes.c_void_p(0))
+        glColorPointer(4, GL_FLOAT, VERTEX_STRIDE, ctypes.c_void_p(8))
+        glDrawArrays(GL_POINTS, 0, n)
+        glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def delete(self):
+        if self._vbo is not None:
+            glDeleteBuffers(1, [self._vbo])
+            self._vbo = None
@@ -0,0 +1,52 @@
+import bisect
+
+# ==================== Platform Store ====================
+# Platforms are kept sorted by their bottom y. Everything the game asks for is
+# "which platforms overlap this y-band", so collision and culling only touch the
+# few platforms near the camera, and platforms that scrolled away are dropped.
+class PlatformStore:
+    def __init__(self):
+        self._platforms = []
+        self._keys = []       # platform.y for each entry, same order
+        self._max_height = 0  # tallest platform seen, bounds the band search
+
+    def __len__(self):
+        return len(self._platforms)
+
+    def __iter__(self):
+        return iter(self._platforms)
+
+    def clear(self):
+        self._platforms.clear()
+        self._keys.clear()
+        self._max_height = 0
+
+    def add(self, platform):
+        self._max_height = max(self._max_height, platform.height)
+        # Generation always moves upwards, so this is almost always an append
+        if not self._keys or platform.y >= self._keys[-1]:
+            self._platforms.append(platform)
+            self._keys.append(platform.y)
+            return
+        i = bisect.bisect_right(self._keys, platform.y)
+        self._platforms.insert(i, platform)
+        self._keys.insert(i, platform.y)
+
+    def top_y(self):
+        return self._keys[-1] if self._keys else None
+
+    def query(self, y_min, y_max):
+        # Platforms with y <= y_max and y + height >= y_min, lowest first
+        lo = bisect.bisect_left(self._keys, y_min - self._max_height)
+        hi = bisect.bisect_right(self._keys, y_max)
+        return [p for p in self._platforms[lo:hi] if p.y + p.height >= y_min]
+
+    def prune_below(self, y):
+        # Drop platforms whose top is below y
+        cut = bisect.bisect_left(self._keys, y - self._max_height)
+        while cut < len(self._platforms) and self._platforms[cut].y + self._platforms[cut].height < y:
+            cut += 1
+        if cut:
+            del self._platforms[:cut]
+            del self._keys[:cut]
+        return cut
@@ -0,0 +1,212 @@
+import time
+import numpy as np
+from text_renderer import TextLabel
+
+# ==================== Frame Profiler ====================
+# Times the phases of every frame with one perf_counter_ns() pair per phase.
+# Phases nest (e.g. "generate" runs inside "prefetch", or inside "update" when
+# the prefetch fell behind), may run several times a frame (one "update" per
+# tick) and are summed per frame. The last `history` frames are kept for the
+# overlay's graph and percentiles.
+#
+# With start_trace(path) every phase also becomes a complete ("X") event in a
+# Chrome trace file, along with a counter ("C") event per frame, readable in
+# chrome://tracing or ui.perfetto.dev. Events are buffered and written every
+# TRACE_FLUSH_FRAMES frames.
+
+DEFAULT_HISTORY = 240
+TRACE_FLUSH_FRAMES = 120
+PERCENTILES = (50, 95, 99)
+
+
+class FrameProfiler:
+    def __init__(self, history=DEFAULT_HISTORY):
+        self.history = history
+        self.frames = 0
+        self.frame_ms = np.zeros(history)
+        self.phase_ms = {}        # phase -> ms per frame over the history, in first-use order
+        self.nested = set()       # phases that only ever ran inside another phase
+        self.top_level = set()
+        self.counters = {}        # latest value of each counter
+        self._frame = {}          # phase -> ns spent so far this frame
+        self._stack = []
+        self._frame_start = None
+        self._origin = time.perf_counter_ns()
+        self._trace = None
+        self._events = []
+
+    # ==================== Recording ====================
+    def begin_frame(self):
+        self._frame_start = time.perf_counter_ns()
+
+    def begin(self, name):
+        self._stack.append((name, time.perf_counter_ns()))
+
+    def end(self):
+        now = time.perf_counter_ns()
+        name, start = self._stack.pop()
+        self._frame[name] = self._frame.get(name, 0) + now - start
+        (self.nested if self._stack else self.top_level).add(name)
+        if self._trace is not None:
+            self._events.append(("X", name, start, now - start))
+
+    def wrap(self, name, fn):
+        # fn, timed as phase `name` whenever it is called
+        def timed(*args, **kwargs):
+            self.begin(name)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.end()
+        return timed
+
+    def count(self, name, value):
+        self.counters[name] = value
+
+    def end_frame(self):
+        now = time.perf_counter_ns()
+        slot = self.frames % self.history
+        self.frame_ms[slot] = (now - self._frame_start) / 1e6
+        for name in self._frame:
+            if name not in self.phase_ms:
+                self.phase_ms[name] = np.zeros(self.history)
+        for name, ms in self.phase_ms.items():
+            ms[slot] = self._frame.get(name, 0) / 1e6
+        self._frame.clear()
+        self.frames += 1
+
+        if self._trace is not None:
+            self._events.append(("X", "frame", self._frame_start, now - self._frame_start))
+            self._events.append(("C", "counters", now, dict(self.counters)))
+            if self.frames % TRACE_FLUSH_FRAMES == 0:
+                self._flush_trace()
+
+    # ==================== Statistics ====================
+    def recent(self, values):
+        # `values` (frame_ms or a phase_ms entry) oldest first, only frames recorded so far
+        if self.frames < self.history:
+            return values[:self.frames]
+        slot = self.frames % self.history
+        return np.concatenate((values[slot:], values[:slot]))
+
+    def percentiles(self, values, pcts=PERCENTILES):
+        recent = self.recent(values)
+        if not len(recent):
+            return [0.0] * len(pcts)
+        return list(np.percentile(recent, pcts))
+
+    # ==================== Chrome Trace ====================
+    def start_trace(self, path):
+        self._trace = open(path, "w")
+        self._trace.write('[\n{"name": "thread_name", "ph": "M", "pid": 1, "tid": 1, "args": {"name": "main"}},\n')
+
+    def _flush_trace(self):
+        lines = []
+        for kind, name, start, value in self._events:
+            ts = (start - self._origin) / 1000
+            if kind == "X":
+                lines.append(f'{{"name": "{name}", "cat": "frame", "ph": "X", "pid": 1, "tid": 1, '
+                             f'"ts": {ts:.3f}, "dur": {value / 1000:.3f}}},\n')
+            else:
+                args = ", ".join(f'"{k}": {v}' for k, v in value.items())
+                lines.append(f'{{"name": "{name}", "ph": "C", "pid": 1, "tid": 1, "ts": {ts:.3f}, '
+                             f'"args": {{{args}}}}},\n')
+        self._trace.writelines(lines)
+        self._events.clear()
+
+    def close_trace(self):
+        if self._trace is None:
+            return
+        self._flush_trace()
+        self._trace.write('{"name": "process_name", "ph": "M", "pid": 1, "args": {"name": "Icy Tower"}}\n]\n')
+        self._trace.close()
+        self._trace = None
+
+
+# ==================== Overlay ====================
+# A stacked bar per frame for the top-level phases, a line at the 60 Hz frame
+# budget, and text with frame / phase percentiles and the counters. The text
+# is refreshed every TEXT_REFRESH_FRAMES frames so it stays readable.
+
+OVERLAY_GRAPH_HEIGHT = 120
+OVERLAY_MS_SCALE = 4.0     # pixels per millisecond
+FRAME_BUDGET_MS = 1000 / 60
+TEXT_REFRESH_FRAMES = 30
+LINE_HEIGHT = 16
+PHASE_COLORS = [
+    (0.95, 0.35, 0.30, 0.9), (0.30, 0.75, 0.35, 0.9), (0.30, 0.55, 0.95, 0.9),
+    (0.95, 0.80, 0.25, 0.9), (0.75, 0.40, 0.90, 0.9), (0.30, 0.85, 0.85, 0.9),
+    (0.95, 0.55, 0.20, 0.9), (0.70, 0.70, 0.70, 0.9),
+]
+
+
+class ProfilerOverlay:
+    def __init__(self, profiler, glyphs, x, y, width):
+        self.profiler = profiler
+        self.glyphs = glyphs
+        self.x = x
+        self.y = y  # bottom left corner of the graph, text goes above it
+        self.width = width
+        self.visible = False
+        self._labels = []
+
+    def toggle(self):
+        self.visible = not self.visible
+
+    def _lines(self):
+        p = self.profiler
+        p50, p95, p99 = p.percentiles(p.frame_ms)
+        lines = [(f"frame  p50 {p50:5.2f}  p95 {p95:5.2f}  p99 {p99:5.2f} ms", (1.0, 1.0, 1.0, 1.0))]
+        for i, name in enumerate(p.phase_ms):
+            p50, p95, p99 = p.percentiles(p.phase_ms[name])
+            indent = "  " if name in p.nested and name not in p.top_level else ""
+            lines.append((f"{indent}{name:<14} {p50:5.2f} {p95:5.2f} {p99:5.2f}",
+                          PHASE_COLORS[i % len(PHASE_COLORS)]))
+        if p.counters:
+            lines.append(("  ".join(f"{k} {v}" for k, v in p.counters.items()), (1.0, 1.0, 1.0, 1.0)))
+        return lines
+
+    def _update_text(self):
+        lines = self._lines()
+        while len(self._labels) < len(lines):
+            self._labels.append(TextLabel(self.glyphs, self.x + 4, 0))
+        top = self.y + OVERLAY_GRAPH_HEIGHT + 4 + LINE_HEIGHT*len(lines)
+        for label, (text, color) in zip(self._labels, lines):
+            top -= LINE_HEIGHT
+            if label.y != top:
+                label.y = top
+                label.text = None  # position changed, lay out again
+            label.color = color
+            label.set_text(text)
+        del self._labels[len(lines):]
+
+    def draw(self, batch):
+        if not self.visible:
+            return
+        p = self.profiler
+        if p.frames % TEXT_REFRESH_FRAMES == 0 or not self._labels:
+            self._update_text()
+
+        text_height = LINE_HEIGHT*len(self._labels) + 8
+        batch.draw_quad(0, self.x, self.y, self.x + self.width,
+                        self.y + OVERLAY_GRAPH_HEIGHT + text_height, color=(0.0, 0.0, 0.0, 0.6))
+
+        # Graph, newest frame on the right
+        bar_w = self.width / p.history
+        recent = {name: p.recent(ms) for name, ms in p.phase_ms.items() if name in p.top_level}
+        colors = {name: PHASE_COLORS[i % len(PHASE_COLORS)] for i, name in enumerate(p.phase_ms)}
+        frames = len(p.recent(p.frame_ms))
+        left = self.x + self.width - frames*bar_w
+        for i in range(frames):
+            x0 = left + i*bar_w
+            y0 = self.y
+            for name, ms in recent.items():
+                h = min(ms[i]*OVERLAY_MS_SCALE, self.y + OVERLAY_GRAPH_HEIGHT - y0)
+                if h > 0:
+                    batch.draw_quad(0, x0, y0, x0 + bar_w, y0 + h, color=colors[name])
+                    y0 += h
+        budget_y = self.y + FRAME_BUDGET_MS*OVERLAY_MS_SCALE
+        batch.draw_quad(0, self.x, budget_y, self.x + self.width, budget_y + 1, color=(1.0, 1.0, 1.0, 0.8))
+
+        for label in self._labels:
+            label.draw(batch)
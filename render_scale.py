@@ -0,0 +1,180 @@
+import ctypes
+from collections import deque
+from OpenGL.GL import *
+from OpenGL.raw.GL.VERSION.GL_3_3 import glGetQueryObjectui64v
+from render_target import RenderTarget
+
+# ==================== Render Scale ====================
+# On fill-rate bound machines (integrated GPUs behind high-DPI panels) the
+# world is drawn into a render target of `scale` times the on-screen size in
+# pixels and stretched over the screen with linear filtering; the HUD is drawn
+# afterwards, straight to the screen, at full resolution. At scale 1 nothing
+# is redirected.
+#
+# With a target frame time the scale follows the GPU: every ADJUST_FRAMES
+# frames the mean GPU time of a frame (from timer queries, read a few frames
+# late so they never stall) is compared with the target. Fill cost goes with
+# the square of the scale, so a slow frame shrinks the scale by the square
+# root of the overrun; the scale only grows back once frames fit in HEADROOM
+# of the target, and moves in SCALE_STEP steps, so it settles instead of
+# reallocating the target every few frames.
+#
+# Software renderers (llvmpipe) report almost no GPU time for their
+# rasterising, so the automatic scale stays put there; a fixed scale works
+# everywhere.
+
+MIN_SCALE = 0.5
+MAX_SCALE = 1.0
+SCALE_STEP = 0.05
+ADJUST_FRAMES = 30
+HEADROOM = 0.7         # grow again once frames take less than this fraction of the target
+QUERY_DEPTH = 4        # timer queries in flight
+MAX_PLAUSIBLE_MS = 1000.0  # some drivers return garbage for their first query
+
+
+class GpuTimer:
+    # GL_TIME_ELAPSED queries in a ring; results are collected once available
+    def __init__(self, depth=QUERY_DEPTH):
+        self.queries = [int(q) for q in glGenQueries(depth)]
+        self._free = list(self.queries)
+        self._pending = deque()
+        self._result = ctypes.c_uint64()
+
+    def begin(self):
+        # False when every query is still in flight; the frame goes untimed
+        if not self._free:
+            return False
+        query = self._free.pop()
+        glBeginQuery(GL_TIME_ELAPSED, query)
+        self._pending.append(query)
+        return True
+
+    def end(self):
+        glEndQuery(GL_TIME_ELAPSED)
+
+    def collect(self):
+        # GPU times in ms of the frames finished since the last call
+        times = []
+        while self._pending and glGetQueryObjectiv(self._pending[0], GL_QUERY_RESULT_AVAILABLE):
+            query = self._pending.popleft()
+            glGetQueryObjectui64v(query, GL_QUERY_RESULT, ctypes.byref(self._result))
+            self._free.append(query)
+            ms = self._result.value / 1e6
+            if ms < MAX_PLAUSIBLE_MS:
+                times.append(ms)
+        return times
+
+    def delete(self):
+        glDeleteQueries(len(self.queries), self.queries)
+        self.queries = self._free = []
+        self._pending.clear()
+
+
+class RenderScaler:
+    def __init__(self, scale=1.0, target_ms=None, min_scale=MIN_SCALE, max_scale=MAX_SCALE):
+        self.min_scale = min_scale
+        self.max_scale = max(max_scale, scale)
+        self.scale = scale
+        self.target_ms = target_ms
+        self.width = self.height = 0  # on-screen size in pixels
+        self.target = None
+        self.changes = 0              # automatic scale changes so far
+        self._times = []
+        self._timing = False
+        self.timer = None
+        if target_ms:
+            try:
+                self.timer = GpuTimer()
+            except Exception as e:
+                print(f"Automatic render scale disabled: {e}")
+
+    @property
+    def active(self):
+        return self.scale != 1.0 and self.width > 0
+
+    def pixel_size(self):
+        return max(1, round(self.width*self.scale)), max(1, round(self.height*self.scale))
+
+    def resize(self, width, height):
+        # The on-screen area the world is shown in, in pixels
+        if (width, height) != (self.width, self.height):
+            self.width, self.height = width, height
+            self._drop_target()
+
+    def set_scale(self, scale):
+        scale = min(self.max_scale, max(self.min_scale, scale))
+        if scale != self.scale:
+            self.scale = scale
+            self._drop_target()
+
+    def _drop_target(self):
+        if self.target is not None:
+            self.target.delete()
+            self.target = None
+
+    # ==================== Drawing ====================
+    def begin_frame(self):
+        self._timing = self.timer is not None and self.timer.begin()
+
+    def end_frame(self):
+        # After the last draw call of a frame; returns True when the scale changed
+        if self._timing:
+            self.timer.end()
+        if self.timer is None:
+            return False
+        self._times.extend(self.timer.collect())
+        if len(self._times) < ADJUST_FRAMES:
+            return False
+        mean = sum(self._times) / len(self._times)
+        self._times.clear()
+        return self._adjust(mean)
+
+    def _adjust(self, mean_ms):
+        if mean_ms > self.target_ms:
+            scale = self.scale * max(0.5, (self.target_ms / mean_ms) ** 0.5)
+            scale = SCALE_STEP * int(scale / SCALE_STEP + 1e-9)         # round down
+        elif mean_ms < self.target_ms * HEADROOM:
+            scale = self.scale + SCALE_STEP
+        else:
+            return False
+        before = self.scale
+        self.set_scale(round(scale, 2))
+        if self.scale == before:
+            return False
+        self.changes += 1
+        return True
+
+    def begin_world(self, world_width, world_height):
+        # Redirects drawing into the scaled target; False when drawing should
+        # go straight to the screen
+        if not self.active:
+            return False
+        if self.target is None:
+            try:
+                self.target = RenderTarget(*self.pixel_size(), filter=GL_LINEAR)
+            except Exception as e:
+                print(f"Render scale disabled: {e}")
+                self.scale = self.max_scale = 1.0
+                self.timer = None
+                return False
+        self.target.begin(0, 0, world_width, world_height)
+        return True
+
+    def end_world(self, batch, world_width, world_height):
+        # Stretches the world over the screen. Blending is off: the target's
+        # alpha is whatever blending left there, but the world is opaque.
+        self.target.end()
+        glDisable(GL_BLEND)
+        glMatrixMode(GL_MODELVIEW)
+        glPushMatrix()
+        glLoadIdentity()
+        batch.draw_quad(self.target.texture, 0, 0, world_width, world_height)
+        batch.flush()
+        glPopMatrix()
+        glEnable(GL_BLEND)
+
+    def delete(self):
+        self._drop_target()
+        if self.timer is not None:
+            self.timer.delete()
+            self.timer = None
@@ -0,0 +1,65 @@
+from OpenGL.GL import *
+
+# ==================== Render Target ====================
+# A texture with a framebuffer object around it. Between begin() and end()
+# everything drawn lands in the texture instead of the window, with an
+# orthographic view of the given world rectangle; end() puts back the
+# viewport, matrices and framebuffer that were current before.
+
+
+class RenderTarget:
+    def __init__(self, width, height, filter=GL_NEAREST):
+        self.width = width
+        self.height = height
+        self.texture = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, filter)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, filter)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, width, height, 0, GL_RGBA, GL_UNSIGNED_BYTE, None)
+        glBindTexture(GL_TEXTURE_2D, 0)
+
+        # Created mid-frame too (a band inside the scaled world), so the
+        # framebuffer being drawn to is put back afterwards
+        previous = glGetIntegerv(GL_FRAMEBUFFER_BINDING)
+        self.fbo = glGenFramebuffers(1)
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+        glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_TEXTURE_2D, self.texture, 0)
+        status = glCheckFramebufferStatus(GL_FRAMEBUFFER)
+        glBindFramebuffer(GL_FRAMEBUFFER, int(previous))
+        if status != GL_FRAMEBUFFER_COMPLETE:
+            self.delete()
+            raise RuntimeError(f"framebuffer incomplete (status 0x{status:x})")
+        self._saved = None
+
+    def begin(self, x0, y0, x1, y1):
+        # Draw the world rectangle (x0, y0)-(x1, y1) into the texture
+        self._saved = (glGetIntegerv(GL_FRAMEBUFFER_BINDING), glGetIntegerv(GL_VIEWPORT))
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+        glViewport(0, 0, self.width, self.height)
+        glMatrixMode(GL_PROJECTION)
+        glPushMatrix()
+        glLoadIdentity()
+        glOrtho(x0, x1, y0, y1, -1, 1)
+        glMatrixMode(GL_MODELVIEW)
+        glPushMatrix()
+        glLoadIdentity()
+
+    def end(self):
+        framebuffer, viewport = self._saved
+        self._saved = None
+        glMatrixMode(GL_PROJECTION)
+        glPopMatrix()
+        glMatrixMode(GL_MODELVIEW)
+        glPopMatrix()
+        glBindFramebuffer(GL_FRAMEBUFFER, int(framebuffer))
+        glViewport(*viewport)
+
+    def delete(self):
+        if self.fbo:
+            glDeleteFramebuffers(1, [self.fbo])
+            self.fbo = 0
+        if self.texture:
+            glDeleteTextures([self.texture])
+            self.texture = 0
@@ -0,0 +1,94 @@
+import argparse
+import struct
+import time
+import zlib
+
+from game_state import GameState, TICK_RATE
+
+# ==================== Input Recording ====================
+# A run is fully determined by its seed and the keys held on every tick, so
+# a replay file is just that: a small header followed by one input bitmask
+# byte per tick (see INPUT_* in game_state.py), zlib-compressed. Held keys
+# give long runs of equal bytes, so a minute of play is typically a few
+# hundred bytes.
+#
+#   python replay.py verify run.icyr     re-simulate headless and check the score
+
+MAGIC = b"ICYR"
+VERSION = 2  # 2: towers come from PlatformStream; version 1 runs no longer replay
+HEADER = struct.Struct("<4sHqII")  # magic, version, seed, tick count, claimed score
+
+
+class Replay:
+    def __init__(self, seed, inputs=b"", score=0):
+        self.seed = seed
+        self.inputs = bytearray(inputs)
+        self.score = score
+
+    def __len__(self):
+        return len(self.inputs)
+
+    def record(self, inputs):
+        self.inputs.append(inputs)
+
+    def save(self, path):
+        payload = zlib.compress(bytes(self.inputs), 9)
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.seed, len(self.inputs), self.score))
+            f.write(payload)
+
+
+def load_replay(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < HEADER.size:
+        raise ValueError(f"{path}: too short to be a replay")
+    magic, version, seed, ticks, score = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"{path}: not a replay file")
+    if version != VERSION:
+        raise ValueError(f"{path}: unsupported replay version {version}")
+    inputs = zlib.decompress(data[HEADER.size:])
+    if len(inputs) != ticks:
+        raise ValueError(f"{path}: expected {ticks} ticks, found {len(inputs)}")
+    return Replay(seed, inputs, score)
+
+
+def fast_forward(replay, state=None, ticks=None):
+    # Steps a GameState through the first `ticks` recorded inputs (all of them
+    # by default) as fast as possible
+    state = state or GameState(seed=replay.seed)
+    end = len(replay.inputs) if ticks is None else min(ticks, len(replay.inputs))
+    step = state.step
+    for inputs in replay.inputs[state.tick:end]:
+        step(inputs)
+    return state
+
+
+# ==================== Command Line ====================
+def verify(path):
+    replay = load_replay(path)
+    start = time.perf_counter()
+    state = fast_forward(replay)
+    elapsed = time.perf_counter() - start
+    print(f"seed {replay.seed}, {len(replay)} ticks ({len(replay) / TICK_RATE:.1f} s of play)")
+    print(f"claimed score {replay.score}, simulated score {state.score}")
+    print(f"re-simulated in {elapsed:.3f} s ({len(replay) / max(elapsed, 1e-9):,.0f} ticks/s)")
+    return state.score == replay.score
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect and verify recorded runs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    verify_cmd = commands.add_parser("verify", help="re-simulate a replay and compare its score")
+    verify_cmd.add_argument("path")
+    args = parser.parse_args(argv)
+
+    if args.command == "verify":
+        ok = verify(args.path)
+        print("OK" if ok else "MISMATCH")
+        raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from benchmark import git_commit, setup_render
+import offscreen
+from bots import greedy_bot
+from game_state import GameState, Platform, WINDOW_HEIGHT, CHAR_HEIGHT
+
+# ==================== Soak Test ====================
+# Plays one game with the greedy bot for millions of ticks on an offscreen
+# context and watches for anything that grows with the length of the session:
+#   rss_mb             resident memory of the process
+#   heap_blocks        blocks held by Python's allocator (sys.getallocatedblocks)
+#   store_platforms    platforms in the game's store
+#   platform_objects   live Platform objects anywhere, found through the gc
+#   gl_textures, gl_buffers, gl_framebuffers
+#                      live GL object names
+#   frame_ms, step_us  cost of a drawn frame and of a simulation tick
+# It is a single session: the camera keeps scrolling and a character that
+# falls out of view is respawned on a platform in the same GameState, so
+# nothing is reset and the tower climbed keeps growing. A line is fitted
+# through each metric against the height climbed (after the first WARMUP of
+# the samples, while caches fill); the test fails when the fitted end is
+# more than the metric's tolerance above the fitted start.
+#
+#   python soak_test.py                                 a million ticks
+#   python soak_test.py --ticks 5000000 --out soak.json
+#   python soak_test.py --tolerance rss_mb=0.05
+#
+# The per-phase breakdown (update, draw and the phases draw_frame() marks)
+# goes in the report, so a slow creep can be pinned on a phase.
+
+DEFAULT_TICKS = 1_000_000
+DEFAULT_SAMPLE_EVERY = 20_000
+DEFAULT_RENDER_EVERY = 10   # draw a frame every this many ticks
+WARMUP = 0.2                # fraction of samples left out of the trend fit
+RESPAWN_MARGIN = 100        # respawn on a platform at least this far inside the view
+TOLERANCES = {              # largest allowed growth over the run, as a fraction of the start
+    "rss_mb": 0.10,
+    "heap_blocks": 0.10,
+    "store_platforms": 0.25,
+    "platform_objects": 0.25,
+    "gl_textures": 0.0,
+    "gl_buffers": 0.0,
+    "gl_framebuffers": 0.0,
+    "frame_ms": 0.5,            # timings are noisy on shared machines; real leaks grow without bound
+    "step_us": 0.5,
+}
+
+
+# ==================== Probes ====================
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        # Peak rather than current outside Linux: still catches growth
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def live_platforms():
+    return sum(1 for o in gc.get_objects() if type(o) is Platform)
+
+
+class GLObjectCounter:
+    # GL cannot list its objects, but names are small integers: generate one
+    # to learn how high they go, then ask glIsTexture() & co. about every
+    # name below it. The highest name seen is remembered in case the driver
+    # hands out freed names again.
+    def __init__(self):
+        from OpenGL import GL
+        self.kinds = {
+            "gl_textures": (GL.glGenTextures, lambda n: GL.glDeleteTextures([n]), GL.glIsTexture),
+            "gl_buffers": (GL.glGenBuffers, lambda n: GL.glDeleteBuffers(1, [n]), GL.glIsBuffer),
+            "gl_framebuffers": (GL.glGenFramebuffers, lambda n: GL.glDeleteFramebuffers(1, [n]), GL.glIsFramebuffer),
+        }
+        self.high = dict.fromkeys(self.kinds, 0)
+
+    def counts(self):
+        counts = {}
+        for kind, (gen, delete, exists) in self.kinds.items():
+            probe = int(gen(1))
+            delete(probe)
+            self.high[kind] = max(self.high[kind], probe)
+            counts[kind] = sum(1 for name in range(1, self.high[kind] + 1) if exists(name))
+        return counts
+
+
+# ==================== Run ====================
+def respawn(state):
+    # Puts a fallen character back on a platform inside the view, in the same
+    # GameState, so the session (and whatever it accumulates) carries on
+    low, high = state.camera_y + RESPAWN_MARGIN, state.camera_y + WINDOW_HEIGHT - RESPAWN_MARGIN
+    platform = min(state.platforms.query(low, high), key=lambda p: p.y, default=None)
+    if platform is None:
+        state.y = state.camera_y + WINDOW_HEIGHT/2
+    else:
+        state.x = platform.x + platform.width/2
+        state.y = platform.y + platform.height + CHAR_HEIGHT/2
+    state.y_velocity = 0
+    state.is_jumping = False
+    state.bounce_effect = False
+    state.bounce_timer = 0
+    state.fall_detected = False
+
+
+def soak(game, ticks, sample_every, render_every, seed=0, progress=None):
+    # Returns the samples; game is the set-up FinalProject module, or None to
+    # run the simulation alone
+    profiler = game.profiler if game else None
+    gl_objects = GLObjectCounter() if game else None
+    if game:
+        from OpenGL.GL import glFinish
+
+    # The camera scrolls at its base speed; the speed-ups would soon outrun
+    # the bot and leave it respawning every tick
+    state = GameState(seed=seed, camera_speed_step=0)
+    respawns = 0
+    samples = []
+    done = 0
+    while done < ticks:
+        step_ns = 0
+        count = min(sample_every, ticks - done)
+        for i in range(count):
+            if state.fall_detected:
+                respawn(state)
+                respawns += 1
+
+            drawing = game is not None and i % render_every == 0
+            if drawing:
+                profiler.begin_frame()
+                profiler.begin("update")
+            inputs = greedy_bot(state)
+            start = time.perf_counter_ns()
+            state.step(inputs)
+            step_ns += time.perf_counter_ns() - start
+            if game is not None:
+                game.state = state
+                game.update_particles(state.events)
+            if drawing:
+                profiler.end()
+                game.update_game_textures()
+                profiler.begin("draw")
+                game.draw_frame(state.x, state.y, state.camera_y)
+                glFinish()
+                profiler.end()
+                profiler.end_frame()
+        done += count
+
+        sample = {
+            "tick": done,
+            "respawns": respawns,
+            "height": state.camera_y,
+            "store_platforms": len(state.platforms),
+            "step_us": step_ns / count / 1000,
+            "rss_mb": rss_mb(),
+            "heap_blocks": sys.getallocatedblocks(),
+            "platform_objects": live_platforms(),
+        }
+        if game:
+            sample.update(gl_objects.counts())
+            sample["frame_ms"] = float(profiler.recent(profiler.frame_ms).mean())
+            sample["phases_ms"] = {name: float(profiler.recent(ms).mean()) for name, ms in profiler.phase_ms.items()}
+        samples.append(sample)
+        if progress:
+            progress(sample)
+    return samples
+
+
+# ==================== Trends ====================
+def trend(heights, values):
+    # (fitted start, fitted end, growth as a fraction of the start) of a line
+    # through values against the height climbed
+    heights = np.asarray(heights, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) < 2 or heights[-1] == heights[0]:
+        return float(values[0]), float(values[-1]), 0.0
+    slope, intercept = np.polyfit(heights, values, 1)
+    start, end = intercept + slope*heights[0], intercept + slope*heights[-1]
+    growth = (end - start) / abs(start) if start else end - start
+    return float(start), float(end), float(growth)
+
+
+def check(samples, tolerances):
+    skip = int(len(samples) * WARMUP)
+    kept = samples[skip:] if len(samples) - skip >= 2 else samples
+    results = {}
+    for metric, tolerance in tolerances.items():
+        if metric not in kept[0]:
+            continue
+        start, end, growth = trend([s["height"] for s in kept], [s[metric] for s in kept])
+        results[metric] = {"start": start, "end": end, "growth": growth, "tolerance": tolerance,
+                           "ok": growth <= tolerance + 1e-9}
+    return results
+
+
+def phase_breakdown(samples):
+    # Mean ms per frame of each phase over the first and last quarter of the run
+    drawn = [s["phases_ms"] for s in samples if "phases_ms" in s]
+    if not drawn:
+        return {}
+    quarter = max(1, len(drawn) // 4)
+    names = {name for phases in drawn for name in phases}
+    return {name: {"early_ms": float(np.mean([p.get(name, 0.0) for p in drawn[:quarter]])),
+                   "late_ms": float(np.mean([p.get(name, 0.0) for p in drawn[-quarter:]]))}
+            for name in sorted(names)}
+
+
+# ==================== Command Line ====================
+def parse_tolerance(text):
+    metric, _, value = text.partition("=")
+    if metric not in TOLERANCES or not value:
+        raise argparse.ArgumentTypeError(f"expected METRIC=FRACTION with METRIC one of {', '.join(TOLERANCES)}")
+    return metric, float(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bot-driven soak test watching memory, GL objects and frame time.")
+    parser.add_argument("--ticks", type=int, default=DEFAULT_TICKS)
+    parser.add_argument("--sample-every", type=int, default=DEFAULT_SAMPLE_EVERY)
+    parser.add_argument("--render-every", type=int, default=DEFAULT_RENDER_EVERY,
+                        help=f"draw a frame every N ticks (default: {DEFAULT_RENDER_EVERY})")
+    parser.add_argument("--no-render", action="store_true", help="simulation only, no GL context")
+    parser.add_argument("--gl", choices=offscreen.PLATFORMS, default="egl", help="offscreen GL platform")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tolerance", type=parse_tolerance, action="append", default=[], metavar="METRIC=FRACTION",
+                        help="override a metric's allowed growth, e.g. rss_mb=0.05")
+    parser.add_argument("--out", metavar="FILE", help="write the samples and verdicts as JSON")
+    args = parser.parse_args(argv)
+
+    game = context = None
+    skipped = None
+    if not args.no_render:
+        game, context, skipped = setup_render(args.gl)
+        if skipped:
+            print(f"rendering skipped: {skipped}", file=sys.stderr)
+
+    def progress(s):
+        line = (f"tick {s['tick']:>9,}  height {s['height']:>10,.0f}  respawns {s['respawns']:>4}  "
+                f"rss {s['rss_mb']:7.1f} MB  heap {s['heap_blocks']:>8,}  platforms {s['store_platforms']:>5}/"
+                f"{s['platform_objects']:<5}  step {s['step_us']:6.1f} us")
+        if "frame_ms" in s:
+            line += (f"  frame {s['frame_ms']:6.2f} ms  gl tex/buf/fbo "
+                     f"{s['gl_textures']}/{s['gl_buffers']}/{s['gl_framebuffers']}")
+        print(line, flush=True)
+
+    start = time.perf_counter()
+    samples = soak(game, args.ticks, args.sample_every, args.render_every, args.seed, progress)
+    elapsed = time.perf_counter() - start
+    if context is not None:
+        context.release()
+
+    tolerances = dict(TOLERANCES, **dict(args.tolerance))
+    verdicts = check(samples, tolerances)
+    phases = phase_breakdown(samples)
+
+    print(f"\n{args.ticks:,} ticks in {elapsed:.0f} s, {samples[-1]['height']:,.0f} px climbed, "
+          f"{samples[-1]['respawns']} respawns")
+    print(f"{'metric':<18} {'start':>12} {'end':>12} {'growth':>8} {'allowed':>8}")
+    for metric, v in verdicts.items():
+        print(f"{metric:<18} {v['start']:>12.2f} {v['end']:>12.2f} {v['growth']:>+8.1%} {v['tolerance']:>8.0%}"
+              f"  {'ok' if v['ok'] else 'GROWING'}")
+    if phases:
+        print(f"\n{'phase':<18} {'early ms':>10} {'late ms':>10}")
+        for name, p in phases.items():
+            print(f"{name:<18} {p['early_ms']:>10.3f} {p['late_ms']:>10.3f}")
+
+    if args.out:
+        report = {"meta": {"commit": git_commit(), "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                           "ticks": args.ticks, "render_every": None if skipped or args.no_render else args.render_every,
+                           "render_skipped": skipped, "elapsed_s": elapsed},
+                  "verdicts": verdicts, "phases": phases, "samples": samples}
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"wrote {args.out}")
+
+    failed = [metric for metric, v in verdicts.items() if not v["ok"]]
+    if failed:
+        print(f"FAIL: growing over the run: {', '.join(failed)}", file=sys.stderr)
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
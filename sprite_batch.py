@@ -0,0 +1,104 @@
+import ctypes
+from array import array
+from OpenGL.GL import *
+
+# ==================== Sprite Batch ====================
+# Collects every textured quad of a layer into one vertex buffer and submits
+# them with one glDrawArrays per texture. Quads are grouped by texture and the
+# groups are drawn in the order their texture was first used, so anything that
+# has to be painted over something drawn later (e.g. the HUD) must go in a
+# separate flush.
+
+FLOATS_PER_VERTEX = 8  # x, y, u, v, r, g, b, a
+VERTEX_STRIDE = FLOATS_PER_VERTEX * 4
+
+WHITE = (1.0, 1.0, 1.0, 1.0)
+
+
+class SpriteBatch:
+    def __init__(self):
+        self._groups = {}   # texture id -> array of interleaved vertices
+        self._vbo = glGenBuffers(1)
+        self._vbo_size = 0
+        # Per-frame counters, read by whoever wants them and reset with reset_stats()
+        self.draw_calls = 0
+        self.texture_binds = 0
+        self.quads = 0
+
+    def reset_stats(self):
+        self.draw_calls = 0
+        self.texture_binds = 0
+        self.quads = 0
+
+    def draw_quad(self, texture, x0, y0, x1, y1, u0=0.0, v0=0.0, u1=1.0, v1=1.0, color=WHITE):
+        # texture 0 means an untextured, flat coloured quad
+        verts = self._groups.get(texture)
+        if verts is None:
+            verts = self._groups[texture] = array("f")
+        r, g, b, a = color
+        verts.extend((
+            x0, y0, u0, v0, r, g, b, a,
+            x1, y0, u1, v0, r, g, b, a,
+            x1, y1, u1, v1, r, g, b, a,
+            x0, y1, u0, v1, r, g, b, a,
+        ))
+
+    def draw_region(self, region, x0, y0, x1, y1, flip_x=False, color=WHITE):
+        # region is an AtlasRegion (see texture_atlas.py)
+        u0, u1 = (region.u1, region.u0) if flip_x else (region.u0, region.u1)
+        self.draw_quad(region.texture, x0, y0, x1, y1, u0, region.v0, u1, region.v1, color)
+
+    def flush(self):
+        if not self._groups:
+            return
+
+        data = array("f")
+        ranges = []
+        for texture, verts in self._groups.items():
+            first = len(data) // FLOATS_PER_VERTEX
+            data.extend(verts)
+            ranges.append((texture, first, len(verts) // FLOATS_PER_VERTEX))
+        self._groups.clear()
+
+        glBindBuffer(GL_ARRAY_BUFFER, self._vbo)
+        nbytes = len(data) * data.itemsize
+        if nbytes > self._vbo_size:
+            glBufferData(GL_ARRAY_BUFFER, nbytes, data.tobytes(), GL_STREAM_DRAW)
+            self._vbo_size = nbytes
+        else:
+            glBufferSubData(GL_ARRAY_BUFFER, 0, nbytes, data.tobytes())
+
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_TEXTURE_COORD_ARRAY)
+        glEnableClientState(GL_COLOR_ARRAY)
+        glVertexPointer(2, GL_FLOAT, VERTEX_STRIDE, ctypes.c_void_p(0))
+        glTexCoordPointer(2, GL_FLOAT, VERTEX_STRIDE, ctypes.c_void_p(8))
+        glColorPointer(4, GL_FLOAT, VERTEX_STRIDE, ctypes.c_void_p(16))
+
+        textured = False
+        for texture, first, count in ranges:
+            if texture == 0:
+                if textured:
+                    glDisable(GL_TEXTURE_2D)
+                    textured = False
+            else:
+                if not textured:
+                    glEnable(GL_TEXTURE_2D)
+                    textured = True
+                glBindTexture(GL_TEXTURE_2D, texture)
+                self.texture_binds += 1
+            glDrawArrays(GL_QUADS, first, count)
+            self.draw_calls += 1
+            self.quads += count // 4
+
+        if textured:
+            glBindTexture(GL_TEXTURE_2D, 0)
+            glDisable(GL_TEXTURE_2D)
+        glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_TEXTURE_COORD_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def delete(self):
+        glDeleteBuffers(1, [self._vbo])
+        self._vbo = 0
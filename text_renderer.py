@@ -0,0 +1,71 @@
+from PIL import Image
+from texture_atlas import pack_images, make_atlas
+
+# ==================== Text Rendering ====================
+# The font is rasterized once, one glyph at a time, into its own small atlas.
+# A TextLabel lays its string out into glyph quads only when the string
+# changes; drawing it every frame just queues those quads into the SpriteBatch.
+
+GLYPHS = "".join(chr(c) for c in range(32, 127))
+GLYPH_ATLAS_SIZE = 512
+
+
+class GlyphAtlas:
+    def __init__(self, font, chars=GLYPHS):
+        import pygame  # only needed once a font exists, keeps importing this module cheap
+        images = {}
+        self.advances = {}
+        for ch in chars:
+            surface = font.render(ch, True, (255, 255, 255))
+            self.advances[ch] = surface.get_width()
+            if surface.get_width() == 0 or surface.get_height() == 0:
+                continue
+            data = pygame.image.tostring(surface, "RGBA", True)
+            images[ch] = (Image.frombytes("RGBA", surface.get_size(), data), False)
+
+        pages, placements = pack_images(images, GLYPH_ATLAS_SIZE)
+        self.atlas = make_atlas([(p.width, p.height, p.tobytes()) for p in pages],
+                                placements, {ch: ch for ch in images})
+        self.atlas.upload()
+
+    def glyph(self, ch):
+        region = self.atlas.get(ch)
+        return region if region is not None or ch in self.advances else self.atlas.get("?")
+
+    def advance(self, ch):
+        return self.advances.get(ch, self.advances.get("?", 0))
+
+    def delete(self):
+        self.atlas.delete()
+
+
+class TextLabel:
+    def __init__(self, glyphs, x, y, color=(1.0, 1.0, 1.0, 1.0)):
+        self.glyphs = glyphs
+        self.x = x
+        self.y = y
+        self.color = color
+        self.text = None
+        self.width = 0
+        self._quads = []
+
+    def set_text(self, text):
+        if text == self.text:
+            return
+        self.text = text
+        self._layout()
+
+    def _layout(self):
+        quads = []
+        pen = self.x
+        for ch in self.text:
+            region = self.glyphs.glyph(ch)
+            if region is not None:
+                quads.append((region, pen, self.y, pen + region.width, self.y + region.height))
+            pen += self.glyphs.advance(ch)
+        self._quads = quads
+        self.width = pen - self.x
+
+    def draw(self, batch):
+        for region, x0, y0, x1, y1 in self._quads:
+            batch.draw_region(region, x0, y0, x1, y1, color=self.color)
@@ -0,0 +1,199 @@
+import hashlib
+from PIL import Image, ImageEnhance
+from OpenGL.GL import *
+
+# ==================== Texture Atlas ====================
+# All sprite images are packed into one (or, if they do not fit, a few) GL
+# textures at load time. Drawing code looks sprites up by name and gets an
+# AtlasRegion with the page texture and the UV rectangle to use.
+#
+# Every image is surrounded by a few pixels of padding filled from its own
+# edges so linear filtering never picks up a neighbour. Images that are tiled
+# (walls, background, platform middles) fill the padding with the opposite
+# edge instead, which gives the same seams GL_REPEAT used to give.
+
+ATLAS_SIZE = 2048
+ATLAS_PADDING = 2
+
+
+class AtlasRegion:
+    __slots__ = ("texture", "page", "u0", "v0", "u1", "v1", "width", "height")
+
+    def __init__(self, page, u0, v0, u1, v1, width, height):
+        self.texture = 0  # GL texture id of the page, set by TextureAtlas.upload()
+        self.page = page
+        self.u0 = u0
+        self.v0 = v0
+        self.u1 = u1
+        self.v1 = v1
+        self.width = width
+        self.height = height
+
+
+# ==================== Image Loading ====================
+def load_image(path, brightness=1.0):
+    try:
+        img = Image.open(path)
+    except Exception as e:
+        print(f"Failed to open texture: {path}\n   {e}")
+        return None
+
+    img = img.transpose(Image.FLIP_TOP_BOTTOM)
+    if brightness != 1.0:
+        img = ImageEnhance.Brightness(img).enhance(brightness)
+    return img.convert("RGBA")
+
+
+def _extrude(img, padding, wrap):
+    w, h = img.size
+    canvas = Image.new("RGBA", (w + 2*padding, h + 2*padding))
+    if wrap:
+        for dx in (-w, 0, w):
+            for dy in (-h, 0, h):
+                canvas.paste(img, (padding + dx, padding + dy))
+        return canvas
+
+    canvas.paste(img, (padding, padding))
+    canvas.paste(img.crop((0, 0, 1, h)).resize((padding, h)), (0, padding))
+    canvas.paste(img.crop((w - 1, 0, w, h)).resize((padding, h)), (padding + w, padding))
+    full_w = w + 2*padding
+    canvas.paste(canvas.crop((0, padding, full_w, padding + 1)).resize((full_w, padding)), (0, 0))
+    canvas.paste(canvas.crop((0, padding + h - 1, full_w, padding + h)).resize((full_w, padding)),
+                 (0, padding + h))
+    return canvas
+
+
+def _file_digest(path):
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return "missing"
+
+
+# ==================== Packing ====================
+def pack_images(images, size=ATLAS_SIZE, padding=ATLAS_PADDING):
+    # images: {key: (PIL RGBA image, wrap)}
+    # returns (pages, placements) where pages is a list of PIL images and
+    # placements maps key -> (page, x, y, width, height) of the unpadded image
+    order = sorted(images, key=lambda k: images[k][0].height, reverse=True)
+    pages = []
+    placements = {}
+    page_used = []  # height used on each page
+    shelf_x = shelf_y = shelf_h = 0
+
+    for key in order:
+        img, wrap = images[key]
+        cell_w = img.width + 2*padding
+        cell_h = img.height + 2*padding
+        if cell_w > size or cell_h > size:
+            raise ValueError(f"Image {key!r} ({img.width}x{img.height}) does not fit in a {size} atlas")
+
+        if not pages or shelf_x + cell_w > size:
+            # Start a new shelf, and a new page if the shelf does not fit
+            shelf_y += shelf_h
+            shelf_x = shelf_h = 0
+            if not pages or shelf_y + cell_h > size:
+                pages.append(Image.new("RGBA", (size, size)))
+                page_used.append(0)
+                shelf_y = 0
+        shelf_h = max(shelf_h, cell_h)
+
+        page = len(pages) - 1
+        pages[page].paste(_extrude(img, padding, wrap), (shelf_x, shelf_y))
+        placements[key] = (page, shelf_x + padding, shelf_y + padding, img.width, img.height)
+        page_used[page] = max(page_used[page], shelf_y + cell_h)
+        shelf_x += cell_w
+
+    # Trim unused rows off the bottom of each page
+    pages = [page.crop((0, 0, size, used)) for page, used in zip(pages, page_used)]
+    return pages, placements
+
+
+# ==================== Atlas ====================
+class TextureAtlas:
+    def __init__(self, pages, regions):
+        # pages: list of (width, height, RGBA bytes); regions: {name: AtlasRegion}
+        self.pages = pages
+        self.regions = regions
+        self.textures = []
+
+    def get(self, name):
+        return self.regions.get(name)
+
+    def upload(self):
+        for width, height, data in self.pages:
+            tex_id = glGenTextures(1)
+            glBindTexture(GL_TEXTURE_2D, tex_id)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, width, height, 0,
+                         GL_RGBA, GL_UNSIGNED_BYTE, data)
+            self.textures.append(tex_id)
+        glBindTexture(GL_TEXTURE_2D, 0)
+        for region in self.regions.values():
+            region.texture = self.textures[region.page]
+
+    def delete(self):
+        if self.textures:
+            glDeleteTextures(self.textures)
+        self.textures = []
+
+
+class AtlasBuilder:
+    def __init__(self, size=ATLAS_SIZE, padding=ATLAS_PADDING):
+        self.size = size
+        self.padding = padding
+        self._names = {}    # name -> (path, brightness)
+        self._sources = {}  # (path, brightness) -> wrap
+
+    def add(self, name, path, brightness=1.0, wrap=False):
+        # The same file with the same settings is only stored once
+        source = (path, brightness)
+        self._names[name] = source
+        self._sources[source] = self._sources.get(source, False) or wrap
+
+    def cache_key(self):
+        # Digest of everything build() depends on: the settings, every name's
+        # load parameters and the bytes of its source file. Paths are left
+        # out so a cache stays valid when the images move.
+        h = hashlib.sha256(f"atlas {self.size} {self.padding}\n".encode())
+        digests = {}
+        for name, (path, brightness) in sorted(self._names.items()):
+            if path not in digests:
+                digests[path] = _file_digest(path)
+            wrap = self._sources[(path, brightness)]
+            h.update(f"{name} {brightness!r} {wrap} {digests[path]}\n".encode())
+        return h.digest()
+
+    def sources(self):
+        # The distinct (path, brightness) pairs build() has to load
+        return list(self._sources)
+
+    def build(self, images=None):
+        # images optionally supplies already decoded {(path, brightness): image},
+        # None for images that failed to load
+        images = dict(images or {})
+        packable = {}
+        for source, wrap in self._sources.items():
+            img = images[source] if source in images else load_image(*source)
+            if img is not None:
+                packable[source] = (img, wrap)
+
+        pages, placements = pack_images(packable, self.size, self.padding)
+        return make_atlas([(p.width, p.height, p.tobytes()) for p in pages], placements, self._names)
+
+
+def make_atlas(pages, placements, names):
+    # Turns pixel-space placements into UV regions. Names whose image failed to
+    # load are left out, so atlas.get() returns None for them.
+    regions = {}
+    for name, source in names.items():
+        if source not in placements:
+            continue
+        page, x, y, w, h = placements[source]
+        page_w, page_h = pages[page][0], pages[page][1]
+        regions[name] = AtlasRegion(page, x / page_w, y / page_h, (x + w) / page_w, (y + h) / page_h, w, h)
+    return TextureAtlas(pages, regions)
@@ -0,0 +1,180 @@
+import argparse
+import csv
+import itertools
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from batch_sim import BatchSimulator
+from bots import greedy_bot_batch
+from game_state import (TICK_RATE, JUMP_SPEED, GRAVITY, CAMERA_SPEED_BASE,
+                        CAMERA_SPEED_STEP, PLATFORM_GAP_RANGE, is_reachable)
+
+# ==================== Difficulty Sweep ====================
+# Plays headless games with the greedy bot over a grid of difficulty settings
+# and prints one row per setting: survival time, score distribution and the
+# share of generated gaps the character cannot jump. Every setting uses the
+# same seeds, so rows are directly comparable. Games are split into chunks
+# that run on a process pool, one BatchSimulator per chunk.
+#
+#   python tune_difficulty.py --camera-speed-base 1 1.5 2 --jump-speed 13 15 17 --runs 1000
+
+DEFAULT_RUNS = 200
+DEFAULT_CHUNK = 256
+DEFAULT_MAX_SECONDS = 300
+
+
+class GapCountingSimulator(BatchSimulator):
+    # Checks every newly generated platform against the one below it
+    def __init__(self, seeds, **settings):
+        self.gaps = 0
+        self.impossible_gaps = 0
+        super().__init__(seeds, **settings)
+
+    def _generate(self, i, max_y):
+        count = self.plat_count[i]
+        below = None
+        if count:
+            below = (self.plat_x[i, count - 1], self.plat_y[i, count - 1] + self.plat_h[i, count - 1],
+                     self.plat_w[i, count - 1])
+        added = super()._generate(i, max_y)
+        count = self.plat_count[i]
+        for k in range(count - added, count):
+            above = (self.plat_x[i, k], self.plat_y[i, k] + self.plat_h[i, k], self.plat_w[i, k])
+            if below is not None:
+                self.gaps += 1
+                if not is_reachable(*below, *above, jump_speed=self.jump_speed[i],
+                                    gravity=self.gravity[i], speed=self.speed[i]):
+                    self.impossible_gaps += 1
+            below = above
+        return added
+
+
+def run_chunk(task):
+    cell, seeds, max_ticks = task
+    settings = dict(cell)
+    sim = GapCountingSimulator(seeds, **settings)
+    while sim.tick < max_ticks and not sim.fall_detected.all():
+        sim.step(greedy_bot_batch(sim))
+    survival = np.where(sim.fall_tick >= 0, sim.fall_tick, sim.tick)
+    return cell, survival, sim.score.copy(), sim.gaps, sim.impossible_gaps
+
+
+def parse_range(text):
+    try:
+        lo, hi = (int(part) for part in text.split("-"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected MIN-MAX pixels, got {text!r}") from None
+    if not 1 <= lo <= hi:
+        raise argparse.ArgumentTypeError(f"gap range {text} must have 1 <= MIN <= MAX")
+    return lo, hi
+
+
+def build_grid(args):
+    keys = ("camera_speed_base", "camera_speed_step", "jump_speed", "gravity", "gap_range")
+    values = (args.camera_speed_base, args.camera_speed_step, args.jump_speed, args.gravity,
+              args.gap_range)
+    return [tuple(zip(keys, combo)) for combo in itertools.product(*values)]
+
+
+def summarize(cell, survival, scores, gaps, impossible):
+    settings = dict(cell)
+    seconds = survival / TICK_RATE
+    return {
+        "camera_speed_base": settings["camera_speed_base"],
+        "camera_speed_step": settings["camera_speed_step"],
+        "jump_speed": settings["jump_speed"],
+        "gravity": settings["gravity"],
+        "gap_range": "%d-%d" % settings["gap_range"],
+        "runs": len(scores),
+        "survival_mean_s": float(seconds.mean()),
+        "survival_p50_s": float(np.median(seconds)),
+        "score_mean": float(scores.mean()),
+        "score_p10": float(np.percentile(scores, 10)),
+        "score_p50": float(np.percentile(scores, 50)),
+        "score_p90": float(np.percentile(scores, 90)),
+        "score_max": int(scores.max()),
+        "impossible_gap_pct": 100.0 * impossible / gaps if gaps else 0.0,
+    }
+
+
+COLUMNS = [
+    # key, title, width, format spec
+    ("camera_speed_base", "cam", 5, ".2f"),
+    ("camera_speed_step", "step", 5, ".2f"),
+    ("jump_speed", "jump", 5, ".1f"),
+    ("gravity", "grav", 6, ".2f"),
+    ("gap_range", "gaps", 8, ""),
+    ("runs", "runs", 6, "d"),
+    ("survival_mean_s", "surv s", 7, ".1f"),
+    ("survival_p50_s", "p50 s", 7, ".1f"),
+    ("score_mean", "score", 7, ".1f"),
+    ("score_p10", "p10", 5, ".0f"),
+    ("score_p50", "p50", 5, ".0f"),
+    ("score_p90", "p90", 5, ".0f"),
+    ("score_max", "max", 5, "d"),
+    ("impossible_gap_pct", "imposs%", 8, ".2f"),
+]
+
+
+def print_table(rows):
+    print(" ".join(f"{title:>{width}}" for _, title, width, _ in COLUMNS))
+    for row in rows:
+        print(" ".join(f"{row[key]:>{width}{spec}}" for key, _, width, spec in COLUMNS))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep difficulty settings with headless bot games.")
+    parser.add_argument("--camera-speed-base", type=float, nargs="+", default=[CAMERA_SPEED_BASE])
+    parser.add_argument("--camera-speed-step", type=float, nargs="+", default=[CAMERA_SPEED_STEP],
+                        help="camera speed added every 10 successful jumps")
+    parser.add_argument("--jump-speed", type=float, nargs="+", default=[JUMP_SPEED])
+    parser.add_argument("--gravity", type=float, nargs="+", default=[GRAVITY])
+    parser.add_argument("--gap-range", type=parse_range, nargs="+", default=[PLATFORM_GAP_RANGE],
+                        help="vertical gap between platforms as MIN-MAX pixels")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="games per setting")
+    parser.add_argument("--max-seconds", type=float, default=DEFAULT_MAX_SECONDS,
+                        help="stop games that survive this long")
+    parser.add_argument("--seed", type=int, default=0, help="first seed; game k uses seed+k")
+    parser.add_argument("--chunk", type=int, default=DEFAULT_CHUNK, help="games per worker task")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--csv", help="also write the table to this CSV file")
+    args = parser.parse_args(argv)
+
+    grid = build_grid(args)
+    max_ticks = int(args.max_seconds * TICK_RATE)
+    seeds = list(range(args.seed, args.seed + args.runs))
+    tasks = [(cell, seeds[i:i + args.chunk], max_ticks)
+             for cell in grid for i in range(0, len(seeds), args.chunk)]
+    print(f"{len(grid)} settings x {args.runs} games, {len(tasks)} tasks on {args.workers} workers",
+          file=sys.stderr)
+
+    start = time.perf_counter()
+    results = {cell: ([], [], 0, 0) for cell in grid}
+    with Pool(args.workers) as pool:
+        for cell, survival, scores, gaps, impossible in pool.imap_unordered(run_chunk, tasks):
+            all_survival, all_scores, all_gaps, all_impossible = results[cell]
+            all_survival.append(survival)
+            all_scores.append(scores)
+            results[cell] = (all_survival, all_scores, all_gaps + gaps, all_impossible + impossible)
+
+    rows = []
+    for cell in grid:
+        survival, scores, gaps, impossible = results[cell]
+        rows.append(summarize(cell, np.concatenate(survival), np.concatenate(scores), gaps, impossible))
+
+    print_table(rows)
+    print(f"{len(grid) * args.runs} games in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    main()